@@ -1,19 +1,10 @@
 import streamlit as st
-import numpy as np
-import wave
-import whisper
-import openai
 import os
-import vosk
-import json
-import sounddevice as sd
-import queue
-import sys
-import time
 import base64
-
-# Load Whisper model
-model = whisper.load_model("base")
+from wake_word import WakeWordListener
+from doula_worker import DoulaWorker
+from profiles import asr_options, load_profile, tts_voice
+from warmup import WarmBackend, start_warmup
 
 # OpenAI API key (from environment variable)
 key = os.getenv("OPENAI_API_KEY")
@@ -47,171 +38,63 @@ else:
 st.title("🍼 Live Doula AI - Birth Assistant")
 st.write("A real-time AI assistant to provide calming support during childbirth.")
 
-# Ensure session state exists
-if "wake_word_detected" not in st.session_state:
-    st.session_state.wake_word_detected = False
-
-
-def detect_wake_word_vosk():
-    """Continuously listens for 'Hey Doula' and resets session after response."""
-    model_path = "vosk-model-small-en-us-0.15"
-
-    if not os.path.exists(model_path):
-        st.error(f"❌ Vosk model not found at {model_path}. Download from: https://alphacephei.com/vosk/models")
-        return False
-
-    model = vosk.Model(model_path)
-    recognizer = vosk.KaldiRecognizer(model, 16000)
-    q = queue.Queue()
-
-    def callback(indata, frames, time, status):
-        """Reads audio from stream into queue."""
-        if status:
-            print(status, file=sys.stderr)
-        q.put(bytes(indata))
-
-    while not st.session_state.wake_word_detected:
-        st.write("🎤 Listening for 'Hey Doula'...")
-        with sd.InputStream(samplerate=16000, channels=1, dtype="int16", callback=callback):
-            while True:
-                data = q.get()
-                if recognizer.AcceptWaveform(data):
-                    result = json.loads(recognizer.Result())
-                    text = result.get("text", "").lower()
-
-                    if "hey" in text or "hey doula" in text:
-                        st.session_state.wake_word_detected = True
-                        st.success("✅ 'Hey Doula' detected! Now recording request...")
-                        return True
-
 
-def record_audio_live(filename="user_input.wav", samplerate=44100, duration=5):
-    """Records audio for 5 seconds after 'Hey Doula' is detected."""
-    if not st.session_state.wake_word_detected:
-        return None
-
-    st.write("🎤 Recording request for 5 seconds...")
-    recorded_audio = sd.rec(int(duration * samplerate), samplerate=samplerate, channels=1, dtype=np.int16)
-    sd.wait()
-
-    with wave.open(filename, 'wb') as wavefile:
-        wavefile.setnchannels(1)
-        wavefile.setsampwidth(2)
-        wavefile.setframerate(samplerate)
-        wavefile.writeframes(recorded_audio.tobytes())
-
-    return filename
-
-
-def speech_to_text(audio_path):
-    """Transcribes speech using Whisper."""
-    result = model.transcribe(audio_path)
-    return result["text"].lower()
+@st.cache_resource
+def get_worker():
+    """Starts the audio pipeline once per server; models and the microphone stay loaded across reruns.
 
+    Listening starts as soon as the wake-word model is loaded; the ASR model keeps warming up behind it.
+    """
+    profile = load_profile()
+    warmup = start_warmup(asr_options=asr_options(profile), api_key=key, voice=tts_voice(profile))
+    warmup.wait("wake")
+    listener = WakeWordListener(low_power=True).start()
+    return DoulaWorker(listener, WarmBackend(warmup), api_key=key, profile=profile).start(), warmup
 
-def get_ai_response(user_text, heart_rate=90, stress_level=5, contractions=3):
-    """Generates AI response or plays relaxing music if requested."""
-    client = openai.OpenAI(api_key=key)
 
-    if "relax music" in user_text or "i want some relax music" in user_text or "play relaxing music" in user_text:
-        music_file = os.path.abspath("relaxing_music.mp3")
+try:
+    worker, warmup = get_worker()
+except FileNotFoundError as e:
+    st.error(str(e))
+    st.stop()
 
-        if os.path.exists(music_file):
-            st.success("🎶 Playing relaxing music...")
-            st.audio(music_file)
-            return None
+# Ensure session state exists
+if "last_event" not in st.session_state:
+    st.session_state.last_event = 0
+    st.session_state.status = "⏳ Starting..."
+    st.session_state.history = []
+
+
+@st.fragment(run_every=0.5)
+def show_pipeline():
+    """Polls the worker's events; the rest of the page is never blocked."""
+    for event in worker.bus.since(st.session_state.last_event):
+        st.session_state.last_event = event["seq"]
+        if event["type"] == "status":
+            st.session_state.status = event["text"]
         else:
-            st.error("❌ Relaxing music file not found! Please check the file location.")
-            return None
-
-    system_prompt = """
-    You are a calming birth assistant AI designed to provide emotional and mental support during childbirth.
-
-    - Your focus is on *calming techniques, relaxation, and mindfulness*.
-    - *Do NOT provide medical advice or diagnose conditions*.
-    - *DO NOT mention labor status, medical risks, or suggest medical actions*.
-    - *Keep responses concise and within 30 seconds of speech (~100 tokens).*
-    - If a user expresses stress, anxiety, or discomfort, respond with *soothing breathing exercises, positive affirmations, and relaxation techniques*.
-    - Encourage the user to *focus on deep breaths, softening their body, and maintaining a calm state of mind*.
-    - If a user asks medical-related questions (e.g., "Is my baby okay?"), gently *redirect them to a healthcare provider* and reinforce *calmness and reassurance*.
-    """
-
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user",
-         "content": f"My heart rate is {heart_rate} BPM, stress is {stress_level}/10, and I have {contractions} contractions per 10 min. Also, {user_text}."}
-    ]
-
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=100  # Limits response length (~30 sec speech)
-        )
-
-        return response.choices[0].message.content
-
-    except Exception as e:
-        st.error(f"❌ Error: {e}")
-        return None
-
-
-def text_to_speech(text, output_file="response.mp3"):
-    """Converts AI-generated text into speech only if text is valid."""
-    if not text or text.strip() == "":
-        return
-
-    client = openai.OpenAI(api_key=key)
-
-    try:
-        response = client.audio.speech.create(
-            model="tts-1",
-            voice="shimmer",
-            input=text,
-        )
-
-        with open(output_file, "wb") as f:
-            f.write(response.content)
-
-        st.success("🔊 AI Speech generated!")
-        st.audio(output_file)
-
-    except openai.OpenAIError as e:
-        st.error(f"❌ Text-to-Speech Error: {e}")
-
-
-def play_relaxing_music(music_file="relaxing_music.mp3"):
-    """Plays relaxing background music."""
-    if os.path.exists(music_file):
-        st.success("🎶 Playing relaxing music...")
-        st.audio(music_file)
-    else:
-        st.error("❌ Relaxing music file not found!")
-
-
-# ✅ Main logic: Automatically loops back to listening after each response
-while True:
-    detect_wake_word_vosk()
-
-    if st.session_state.wake_word_detected:
-        audio_file = record_audio_live()
-
-        if audio_file:
-            transcribed_text = speech_to_text(audio_file)
-
-            if "relax music" in transcribed_text or "i want some relax music" in transcribed_text or "play relaxing " \
-                                                                                                     "music" in \
-                    transcribed_text:
-                play_relaxing_music()
-                # Wait for the music to finish (assuming ~150 seconds)
-                time.sleep(160)  # Adjust according to actual music length
-            else:
-                ai_response = get_ai_response(transcribed_text, heart_rate=130, stress_level=9, contractions=5)
-                if ai_response:
-                    text_to_speech(ai_response)
-                    # Estimate speech duration (~30 seconds max)
-                    time.sleep(30)
-
-        # 🔄 Only restart listening after playback finishes
-        st.session_state.wake_word_detected = False
+            st.session_state.history.append(event)
+
+    st.info(st.session_state.status)
+    if warmup.state == "degraded":
+        st.error("❌ Failed to load: " + ", ".join(f"{name} ({error})" for name, error in warmup.failed().items()))
+    elif warmup.state != "ready":
+        st.caption("⏳ Still loading the speech model; the wake word and spoken commands already work.")
+
+    vitals = worker.vitals.snapshot()
+    if vitals["time"] is not None:
+        st.caption(f"❤️ {vitals['heart_rate']} BPM · 🌊 {vitals['contractions']} contractions / 10 min · "
+                   f"stress {vitals['stress_level']}/10")
+
+    for event in reversed(st.session_state.history[-10:]):
+        if event["type"] == "transcript":
+            st.write(f"📝 You: {event['text']}")
+        elif event["type"] == "response":
+            st.success(f"🤖 {event['text']}")
+        elif event["type"] == "alert":
+            st.warning(event["text"])
+        elif event["type"] == "error":
+            st.error(event["text"])
+
+
+show_pipeline()
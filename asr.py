@@ -0,0 +1,185 @@
+import json
+import os
+import threading
+
+import numpy as np
+
+from audio_capture import WHISPER_RATE
+from metrics import register_collector
+
+# Defaults, overridable through the environment so each deployment can tune them
+# Empty picks default_fallback(): faster-whisper (int8) when installed, otherwise openai-whisper
+ASR_BACKEND = os.getenv("DOULA_ASR_BACKEND", "")
+ASR_MODEL_SIZE = os.getenv("DOULA_ASR_MODEL", "base")
+# Pinning the language skips Whisper's language-detection pass; empty means auto-detect
+ASR_LANGUAGE = os.getenv("DOULA_ASR_LANGUAGE", "en") or None
+ASR_THREADS = int(os.getenv("DOULA_ASR_THREADS", "0")) or None
+
+
+class WhisperBackend:
+    """The reference openai-whisper model, on CPU in fp32."""
+
+    name = "whisper"
+
+    def __init__(self, model_size=ASR_MODEL_SIZE, language=ASR_LANGUAGE, threads=ASR_THREADS):
+        import torch
+        import whisper
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.language = language
+        self.model = whisper.load_model(model_size, device="cpu")
+        self._torch = torch
+        self._whisper = whisper
+
+    def segments(self, audio, prompt=None):
+        """Returns [(start_s, end_s, text), ...] for a 16 kHz float32 array."""
+        result = self.model.transcribe(audio, initial_prompt=prompt or None, language=self.language,
+                                       condition_on_previous_text=False, fp16=False)
+        return [(segment["start"], segment["end"], segment["text"]) for segment in result["segments"]]
+
+    def transcribe(self, audio, prompt=None):
+        return "".join(text for _, _, text in self.segments(audio, prompt)).strip()
+
+    def transcribe_batch(self, audios):
+        """Transcribes several utterances (up to 30 s each) in one batched encoder and decoder pass."""
+        whisper = self._whisper
+        mels = self._torch.stack([whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), self.model.dims.n_mels)
+                                  for audio in audios])
+        options = whisper.DecodingOptions(language=self.language, without_timestamps=True, fp16=False)
+        return [result.text.strip() for result in whisper.decode(self.model, mels, options)]
+
+
+class FasterWhisperBackend:
+    """Whisper through CTranslate2 with int8 weights (pip install faster-whisper)."""
+
+    name = "faster-whisper"
+
+    def __init__(self, model_size=ASR_MODEL_SIZE, language=ASR_LANGUAGE, threads=ASR_THREADS):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise ImportError("❌ The faster-whisper backend needs: pip install faster-whisper")
+
+        self.language = language
+        self.model = WhisperModel(model_size, device="cpu", compute_type="int8", cpu_threads=threads or 0)
+
+    def segments(self, audio, prompt=None):
+        segments, _ = self.model.transcribe(audio, language=self.language, initial_prompt=prompt or None,
+                                            beam_size=1, condition_on_previous_text=False)
+        return [(segment.start, segment.end, segment.text) for segment in segments]
+
+    def transcribe(self, audio, prompt=None):
+        return "".join(text for _, _, text in self.segments(audio, prompt)).strip()
+
+    def transcribe_batch(self, audios):
+        # CTranslate2 batches the segments of one file, not separate files
+        return [self.transcribe(audio) for audio in audios]
+
+
+class VoskFastPathBackend:
+    """Uses the Vosk transcript when Vosk is confident, and a Whisper backend otherwise.
+
+    The Vosk model is already loaded for wake-word detection, and a
+    full-vocabulary Vosk pass costs a fraction of a Whisper decode, so clear
+    requests skip Whisper entirely. The pass is separate from the wake
+    listener's: that recognizer is restricted to the wake grammar and stops
+    at the wake word, so it has no transcript of the request to reuse.
+    """
+
+    name = "vosk-fast-path"
+
+    def __init__(self, fallback=None, min_confidence=0.9, min_words=2, **options):
+        from wake_word import load_vosk_model
+
+        self.vosk_model = load_vosk_model()
+        self.fallback = fallback or default_fallback(**options)
+        self.min_confidence = min_confidence
+        self.min_words = min_words
+        self.fast_hits = 0
+        self.fallbacks = 0
+
+    def vosk_transcript(self, audio):
+        """Returns (text, mean word confidence) from a full-vocabulary Vosk pass."""
+        import vosk
+
+        recognizer = vosk.KaldiRecognizer(self.vosk_model, WHISPER_RATE)
+        recognizer.SetWords(True)
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+        results = [recognizer.Result()] if recognizer.AcceptWaveform(pcm) else []
+        results.append(recognizer.FinalResult())
+        words = [word for result in results for word in json.loads(result).get("result", [])]
+        if not words:
+            return "", 0.0
+        return " ".join(word["word"] for word in words), float(np.mean([word["conf"] for word in words]))
+
+    def segments(self, audio, prompt=None):
+        text, confidence = self.vosk_transcript(audio)
+        if len(text.split()) >= self.min_words and confidence >= self.min_confidence:
+            self.fast_hits += 1
+            return [(0.0, len(audio) / WHISPER_RATE, " " + text)]
+        self.fallbacks += 1
+        return self.fallback.segments(audio, prompt)
+
+    def transcribe(self, audio, prompt=None):
+        return "".join(text for _, _, text in self.segments(audio, prompt)).strip()
+
+    def transcribe_batch(self, audios):
+        """Confident Vosk transcripts are kept; only the rest go to the fallback, as one batch."""
+        texts, unsure = [], []
+        for i, audio in enumerate(audios):
+            text, confidence = self.vosk_transcript(audio)
+            if len(text.split()) >= self.min_words and confidence >= self.min_confidence:
+                self.fast_hits += 1
+            else:
+                self.fallbacks += 1
+                unsure.append(i)
+            texts.append(text)
+        if unsure:
+            for i, text in zip(unsure, self.fallback.transcribe_batch([audios[i] for i in unsure])):
+                texts[i] = text
+        return texts
+
+
+def default_fallback(**options):
+    """The int8 backend when faster-whisper is installed, otherwise openai-whisper."""
+    try:
+        return FasterWhisperBackend(**options)
+    except ImportError:
+        return WhisperBackend(**options)
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+    VoskFastPathBackend.name: VoskFastPathBackend,
+}
+
+_lock = threading.Lock()
+_backends = {}
+
+
+def get_backend(name=ASR_BACKEND, **options):
+    """Returns the process-wide ASR backend, loading it on first use.
+
+    Without a name it is default_fallback(): faster-whisper when installed, otherwise openai-whisper.
+    """
+    if name and name not in BACKENDS:
+        raise ValueError(f"❌ Unknown ASR backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    cache_key = (name or None, tuple(sorted(options.items())))
+    with _lock:
+        if cache_key not in _backends:
+            _backends[cache_key] = BACKENDS[name](**options) if name else default_fallback(**options)
+        return _backends[cache_key]
+
+
+def _collect_fast_path_stats():
+    samples = []
+    for backend in list(_backends.values()):
+        if isinstance(backend, VoskFastPathBackend):
+            samples += [("doula_asr_fast_path_total", "counter", {"result": "vosk"}, backend.fast_hits),
+                        ("doula_asr_fast_path_total", "counter", {"result": "whisper"}, backend.fallbacks)]
+    return samples
+
+
+register_collector(_collect_fast_path_stats)
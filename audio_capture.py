@@ -0,0 +1,323 @@
+import numpy as np
+import wave
+import queue
+import sys
+import threading
+import time
+
+from metrics import span
+
+# Analysis frame used by the endpointer (30 ms is the usual VAD frame size)
+FRAME_MS = 30
+
+# Whisper consumes 16 kHz mono float32 in [-1, 1]
+WHISPER_RATE = 16000
+
+
+class MicrophoneSource:
+    """Streams int16 mono blocks from the default microphone."""
+
+    def __init__(self, samplerate=16000, blocksize=None):
+        self.samplerate = samplerate
+        self.blocksize = blocksize or int(samplerate * FRAME_MS / 1000)
+        self._queue = queue.Queue()
+        self._stream = None
+        self.ended = False
+
+    def _callback(self, indata, frames, time_info, status):
+        """Reads audio from stream into queue."""
+        if status:
+            print(status, file=sys.stderr)
+        self._queue.put(indata[:, 0].copy())
+
+    def start(self):
+        # Imported here: loading PortAudio fails on machines without audio hardware,
+        # and nothing but the live microphone needs it
+        import sounddevice as sd
+
+        if self._stream is None:
+            self._stream = sd.InputStream(samplerate=self.samplerate, channels=1, dtype="int16",
+                                          blocksize=self.blocksize, callback=self._callback)
+            self._stream.start()
+        return self
+
+    def read(self, timeout=None):
+        """Returns the next block, or None if nothing arrived within timeout."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class WavFileSource:
+    """Replays a mono 16-bit WAV file as if it were a microphone.
+
+    With realtime=True each block is delivered at the pace it would arrive from
+    a real device, which is what latency measurements need.
+    """
+
+    def __init__(self, path, blocksize=None, realtime=False):
+        with wave.open(path, "rb") as wavefile:
+            if wavefile.getsampwidth() != 2:
+                raise ValueError(f"❌ Only 16-bit WAV files are supported: {path}")
+            self.samplerate = wavefile.getframerate()
+            channels = wavefile.getnchannels()
+            audio = np.frombuffer(wavefile.readframes(wavefile.getnframes()), dtype=np.int16)
+        self.audio = audio.reshape(-1, channels)[:, 0] if channels > 1 else audio
+        self.blocksize = blocksize or int(self.samplerate * FRAME_MS / 1000)
+        self.realtime = realtime
+        self._pos = 0
+        self._started_at = None
+
+    @property
+    def ended(self):
+        return self._pos >= len(self.audio)
+
+    def start(self):
+        self._started_at = time.perf_counter()
+        return self
+
+    def read(self, timeout=None):
+        """Returns the next block, or None once the file is exhausted."""
+        if self._pos >= len(self.audio):
+            return None
+        block = self.audio[self._pos:self._pos + self.blocksize]
+        self._pos += len(block)
+        if self.realtime:
+            due = self._started_at + self._pos / self.samplerate
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return block
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def frame_levels(frames):
+    """Returns the dBFS level of each row of an (n, frame_len) int16 array."""
+    power = np.mean(np.square(frames, dtype=np.float64), axis=1) / 32768.0 ** 2
+    return 10 * np.log10(power + 1e-10)
+
+
+class AudioRing:
+    """Fixed-size ring of int16 samples addressed by absolute sample position.
+
+    One writer (the capture thread) appends; any number of readers keep their
+    own position, so wake-word detection and recording share a single stream.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buffer = np.zeros(capacity, dtype=np.int16)
+        self._cond = threading.Condition()
+        self.end = 0
+        self.closed = False
+
+    def write(self, block):
+        with self._cond:
+            end = self.end + len(block)
+            block = block[-self.capacity:]
+            start = (end - len(block)) % self.capacity
+            first = min(len(block), self.capacity - start)
+            self._buffer[start:start + first] = block[:first]
+            self._buffer[:len(block) - first] = block[first:]
+            self.end = end
+            self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def read(self, position, timeout=None):
+        """Returns (samples, new_position) for everything written since `position`.
+
+        Blocks until new audio arrives, the timeout expires or the ring is closed.
+        Audio older than the ring's capacity is skipped.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.end > position or self.closed, timeout=timeout)
+            position = max(position, self.end - self.capacity)
+            if position >= self.end:
+                return np.zeros(0, dtype=np.int16), position
+            start = position % self.capacity
+            stop = start + (self.end - position)
+            if stop <= self.capacity:
+                samples = self._buffer[start:stop].copy()
+            else:
+                samples = np.concatenate((self._buffer[start:], self._buffer[:stop - self.capacity]))
+            return samples, self.end
+
+
+class Endpointer:
+    """Energy-based voice activity endpointing.
+
+    Speech is any frame whose RMS level is `threshold_db` above the running
+    noise floor (and never below `min_level_db`). Capture ends once
+    `hangover_ms` of trailing silence follows speech, but never before
+    `min_ms` and always at `max_ms`.
+    """
+
+    def __init__(self, samplerate, threshold_db=12.0, min_level_db=-50.0, hangover_ms=700,
+                 min_ms=500, max_ms=10000, noise_db=None):
+        self.frame_len = int(samplerate * FRAME_MS / 1000)
+        self.threshold_db = threshold_db
+        self.min_level_db = min_level_db
+        self.initial_noise_db = min_level_db - threshold_db if noise_db is None else noise_db
+        self.hangover_frames = max(1, int(hangover_ms / FRAME_MS))
+        self.min_frames = int(min_ms / FRAME_MS)
+        self.max_frames = int(max_ms / FRAME_MS)
+        self.reset()
+
+    def reset(self):
+        self.noise_db = self.initial_noise_db
+        self.frames = 0
+        self.speech_frames = 0
+        self.silent_run = 0
+        self.last_speech_frame = None
+        self.done = False
+        self._pending = np.zeros(0, dtype=np.int16)
+
+    def feed(self, block):
+        """Consumes a block of samples; returns True once the utterance has ended."""
+        if self.done:
+            return True
+
+        data = np.concatenate((self._pending, block))
+        n = len(data) // self.frame_len
+        self._pending = data[n * self.frame_len:]
+        if n == 0:
+            return False
+
+        levels = frame_levels(data[:n * self.frame_len].reshape(n, self.frame_len))
+        for level in levels:
+            threshold = max(self.noise_db + self.threshold_db, self.min_level_db)
+            is_speech = level > threshold
+            # Follow the noise floor quickly on silence and very slowly on
+            # "speech", so a steady loud background is eventually absorbed
+            rate = 0.005 if is_speech else 0.05
+            self.noise_db += rate * (level - self.noise_db)
+
+            self.frames += 1
+            if is_speech:
+                self.speech_frames += 1
+                self.silent_run = 0
+                self.last_speech_frame = self.frames
+            else:
+                self.silent_run += 1
+
+            if self.frames >= self.max_frames:
+                self.done = True
+            elif (self.speech_frames and self.frames >= self.min_frames
+                  and self.silent_run >= self.hangover_frames):
+                self.done = True
+            if self.done:
+                return True
+        return False
+
+    @property
+    def speech_end_ms(self):
+        """Offset of the last speech frame's end, or None if no speech was heard."""
+        if self.last_speech_frame is None:
+            return None
+        return self.last_speech_frame * FRAME_MS
+
+
+def resample(audio, src_rate, dst_rate=WHISPER_RATE):
+    """Resamples float32 mono audio in-process (windowed-sinc low-pass + interpolation)."""
+    if src_rate == dst_rate or len(audio) == 0:
+        return audio
+    if dst_rate < src_rate:
+        # Low-pass below the new Nyquist frequency to avoid aliasing
+        cutoff = 0.9 * dst_rate / src_rate / 2
+        taps = np.arange(-32, 33)
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps))
+        audio = np.convolve(audio, (kernel / kernel.sum()).astype(np.float32), mode="same")
+    n_out = int(round(len(audio) * dst_rate / src_rate))
+    positions = np.arange(n_out, dtype=np.float64) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(audio)), audio).astype(np.float32)
+
+
+def blocks_to_float32(blocks, samplerate):
+    """Joins int16 blocks into one 16 kHz float32 buffer ready for Whisper.
+
+    The buffer is allocated once and scaled in place; anything not captured at
+    16 kHz is resampled in-process instead of going through ffmpeg.
+    """
+    audio = np.empty(sum(len(block) for block in blocks), dtype=np.float32)
+    pos = 0
+    for block in blocks:
+        audio[pos:pos + len(block)] = block
+        pos += len(block)
+    audio *= 1.0 / 32768.0
+    return resample(audio, samplerate, WHISPER_RATE)
+
+
+def capture_utterance(source, on_block=None, **endpointer_args):
+    """Reads blocks from an audio source until the endpointer detects trailing silence.
+
+    `on_block` is called with every captured block as it arrives, e.g. to start
+    transcribing before the utterance is over. Returns the utterance as a
+    16 kHz float32 array and a dict with timing information.
+    """
+    endpointer = Endpointer(source.samplerate, **endpointer_args)
+    blocks = []
+    started = time.perf_counter()
+
+    with span("capture"):
+        while True:
+            block = source.read(timeout=1.0)
+            if block is None:
+                if source.ended:
+                    break
+                continue
+            blocks.append(block)
+            if on_block:
+                on_block(block)
+            if endpointer.feed(block):
+                break
+
+    audio = blocks_to_float32(blocks, source.samplerate)
+    info = {
+        "duration_ms": 1000 * len(audio) / WHISPER_RATE,
+        "speech_end_ms": endpointer.speech_end_ms,
+        "wall_ms": 1000 * (time.perf_counter() - started),
+        "hit_max": endpointer.frames >= endpointer.max_frames,
+    }
+    return audio, info
+
+
+def load_wav(filename):
+    """Reads a 16-bit WAV file as a 16 kHz float32 array."""
+    source = WavFileSource(filename)
+    return blocks_to_float32([source.audio], source.samplerate)
+
+
+def save_wav(filename, audio, samplerate=WHISPER_RATE):
+    """Writes mono samples (int16, or float32 in [-1, 1]) to a WAV file."""
+    if audio.dtype != np.int16:
+        audio = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    with wave.open(filename, 'wb') as wavefile:
+        wavefile.setnchannels(1)
+        wavefile.setsampwidth(2)
+        wavefile.setframerate(samplerate)
+        wavefile.writeframes(audio.tobytes())
@@ -0,0 +1,97 @@
+"""Real-time factor, word error rate and peak memory for each ASR backend.
+
+Usage:
+    python benchmarks/bench_asr.py fixture.wav [...] [--backends whisper faster-whisper vosk-fast-path]
+                                   [--model base] [--language en] [--threads N]
+
+Each fixture needs a reference transcript next to it (fixture.txt). Every
+backend runs in its own process so peak RSS is measured in isolation.
+"""
+import argparse
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from audio_capture import WHISPER_RATE, load_wav  # noqa: E402
+
+
+def words(text):
+    return re.sub(r"[^a-z0-9' ]", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref, hyp = words(reference), words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / max(1, len(ref))
+
+
+def run_backend(name, options, fixtures, results):
+    from asr import get_backend
+
+    started = time.perf_counter()
+    backend = get_backend(name, **options)
+    load_s = time.perf_counter() - started
+
+    audio_s = decode_s = errors = 0.0
+    for path, reference in fixtures:
+        audio = load_wav(path)
+        started = time.perf_counter()
+        text = backend.transcribe(audio)
+        decode_s += time.perf_counter() - started
+        audio_s += len(audio) / WHISPER_RATE
+        errors += word_error_rate(reference, text)
+
+    # ru_maxrss is in KiB on Linux
+    results.put({
+        "backend": name,
+        "load_s": load_s,
+        "rtf": decode_s / audio_s,
+        "wer": errors / len(fixtures),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", nargs="+", help="16-bit mono WAV files with a .txt reference alongside")
+    parser.add_argument("--backends", nargs="+", default=["whisper", "faster-whisper", "vosk-fast-path"])
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    fixtures = []
+    for path in args.fixtures:
+        with open(os.path.splitext(path)[0] + ".txt", encoding="utf-8") as f:
+            fixtures.append((path, f.read()))
+
+    options = {"model_size": args.model, "language": args.language, "threads": args.threads}
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+
+    print(f"{'backend':<16}{'load s':>8}{'RTF':>8}{'WER':>8}{'peak RSS MB':>13}")
+    for name in args.backends:
+        process = context.Process(target=run_backend, args=(name, options, fixtures, results))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            print(f"{name:<16}  failed (exit code {process.exitcode})")
+            continue
+        result = results.get()
+        print(f"{name:<16}{result['load_s']:>8.1f}{result['rtf']:>8.3f}{result['wer']:>8.3f}"
+              f"{result['peak_rss_mb']:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Per-turn cost of handing a recording to Whisper: WAV file + ffmpeg vs in memory.
+
+Usage:
+    python benchmarks/bench_audio_path.py [--repeat N]
+
+The "file" path reproduces what the app used to do: write `user_input.wav` at
+44.1 kHz and let Whisper decode it, which runs the same ffmpeg command as
+`whisper.audio.load_audio`. The "memory" paths build the float32 16 kHz buffer
+directly, either from 16 kHz capture or by resampling 44.1 kHz in-process.
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from audio_capture import FRAME_MS, WHISPER_RATE, blocks_to_float32, save_wav  # noqa: E402
+
+
+def ffmpeg_decode(path):
+    """Same decode as whisper.audio.load_audio."""
+    cmd = ["ffmpeg", "-nostdin", "-threads", "0", "-i", path, "-f", "s16le", "-ac", "1",
+           "-acodec", "pcm_s16le", "-ar", str(WHISPER_RATE), "-"]
+    out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    return np.frombuffer(out, np.int16).flatten().astype(np.float32) / 32768.0
+
+
+def blocks(seconds, samplerate):
+    rng = np.random.default_rng(0)
+    audio = (rng.normal(0, 3000, int(seconds * samplerate))).astype(np.int16)
+    size = int(samplerate * FRAME_MS / 1000)
+    return [audio[i:i + size] for i in range(0, len(audio), size)]
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(1000 * (time.perf_counter() - start))
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    have_ffmpeg = shutil.which("ffmpeg") is not None
+    if not have_ffmpeg:
+        print("⚠ ffmpeg not found on PATH; the WAV + ffmpeg column is unmeasured (n/a).")
+
+    print(f"{'utterance':>10}{'wav+ffmpeg ms':>16}{'memory@16k ms':>16}{'memory@44.1k ms':>18}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "user_input.wav")
+        for seconds in (1, 3, 5, 10):
+            blocks_44k = blocks(seconds, 44100)
+            blocks_16k = blocks(seconds, WHISPER_RATE)
+
+            def file_path():
+                save_wav(path, np.concatenate(blocks_44k), 44100)
+                return ffmpeg_decode(path)
+
+            file_ms = f"{best_of(file_path, args.repeat):.1f}" if have_ffmpeg else "n/a"
+            mem_16k = best_of(lambda: blocks_to_float32(blocks_16k, WHISPER_RATE), args.repeat)
+            mem_44k = best_of(lambda: blocks_to_float32(blocks_44k, 44100), args.repeat)
+            print(f"{seconds:>9}s{file_ms:>16}{mem_16k:>16.2f}{mem_44k:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
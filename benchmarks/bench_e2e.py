@@ -0,0 +1,269 @@
+"""End-to-end turn latency: wake -> record -> transcribe -> respond -> speak, per stage.
+
+Usage:
+    python benchmarks/bench_e2e.py [fixture.wav ...] [--turns N] [--asr reference|whisper|...]
+                                   [--wake] [--jitter S] [--output results.json] [--compare baseline.json]
+
+Each fixture is replayed at microphone pace as the microphone and driven
+through a conversation turn: endpointing, incremental ASR, intent routing,
+the calming library or session memory + speak_with_deadline against the
+local mock OpenAI server, and the playback engine with a null sink. A
+fixture needs its transcript next to it (fixture.txt); "--asr reference"
+uses that transcript instead of a model, so the rest of the loop can be
+measured without one. Every turn starts with a scratch speech cache that
+holds only the calming library (in the mock's voice): the mock's reply is
+the same every time, and a real one is not. With --wake the fixture must start with the wake
+word and the Vosk model is needed.
+
+Without fixtures, synthetic ones (noise + voiced bursts) are generated with
+reference requests. --output saves every turn and the per-stage
+percentiles as JSON; --compare prints the change against an earlier run
+and exits with status 1 if a stage got more than --threshold slower.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bench_endpointing import SAMPLERATE, synth_utterance  # noqa: E402
+from mock_openai_server import MockConfig, scratch_speech_cache, start_server  # noqa: E402
+from asr import get_backend  # noqa: E402
+from audio_capture import WavFileSource, capture_utterance, save_wav  # noqa: E402
+from deadline import DEADLINE_BUDGET_S, DEADLINE_STATS, speak_with_deadline  # noqa: E402
+from incremental_asr import transcribe_while_recording  # noqa: E402
+from intents import COMMAND_INTENTS, route  # noqa: E402
+from memory import SessionMemory  # noqa: E402
+from openai_client import ENDPOINT_STATS, get_async_client, get_client, run_async  # noqa: E402
+from playback import EnginePlayer, NullSink, PlaybackEngine  # noqa: E402
+from prompts import build_messages  # noqa: E402
+from tts_cache import CALMING_LIBRARY, library_clip  # noqa: E402
+
+STAGES = ("wake", "endpoint", "transcribe", "route", "ttft", "ttfa", "e2e")
+PERCENTILES = (50, 95, 99)
+
+SYNTHETIC_REQUESTS = (
+    ("short", 0.8, "I'm so scared"),
+    ("question", 2.5, "Is it normal that the pain comes in waves like this?"),
+    ("breathe", 1.5, "Help me breathe"),
+    ("long", 6.0, "My back hurts so much and I don't know how much longer I can keep going like this"),
+)
+
+
+def synthetic_fixtures(directory):
+    paths = []
+    for seed, (name, speech_s, text) in enumerate(SYNTHETIC_REQUESTS):
+        audio, _ = synth_utterance(speech_s, seed=seed)
+        path = os.path.join(directory, f"{name}.wav")
+        save_wav(path, audio, SAMPLERATE)
+        with open(os.path.splitext(path)[0] + ".txt", "w", encoding="utf-8") as f:
+            f.write(text)
+        paths.append(path)
+    return paths
+
+
+def reference_asr(text):
+    """A transcriber that answers instantly with the fixture's reference transcript."""
+    def segments(audio, prompt=None):
+        return [(0.0, len(audio) / SAMPLERATE, " " + text)]
+    return segments
+
+
+class TimedPlayer:
+    """Records when the first chunk of a response is handed to the playback engine."""
+
+    def __init__(self, player):
+        self.player = player
+        self.first_audio = None
+
+    async def play(self, pcm):
+        if self.first_audio is None:
+            self.first_audio = time.perf_counter()
+        await self.player.play(pcm)
+
+    async def close(self):
+        await self.player.close()
+
+
+def run_turn(path, args, client, memory, engine, transcribe):
+    """One conversation turn on a fixture; returns its stage timings (ms) and outcome."""
+    turn = {"fixture": os.path.basename(path)}
+    source = WavFileSource(path, realtime=True)
+    capture_start = 0
+    if args.wake:
+        from wake_word import WakeWordListener
+
+        listener = WakeWordListener(source=source, low_power=True).start()
+        capture_start = listener.wait_for_wake_word(position=0)
+        if capture_start is None:
+            listener.close()
+            turn["outcome"] = "no wake word"
+            return turn
+        turn["wake"] = 1000 * (time.perf_counter() - source._started_at) - 1000 * capture_start / source.samplerate
+
+        def capture(on_block):
+            return listener.record_after(capture_start, on_block=on_block)
+    else:
+        source.start()
+
+        def capture(on_block):
+            return capture_utterance(source, on_block=on_block)
+
+    _, info, text = transcribe_while_recording(capture, transcribe, source.samplerate)
+    transcribed = time.perf_counter()
+    if args.wake:
+        listener.close()
+    # Speech end as the endpointer placed it, on the replay clock
+    speech_end = source._started_at + capture_start / source.samplerate + (info["speech_end_ms"] or 0) / 1000
+    turn["endpoint"] = 1000 * (transcribed - speech_end) - info["finalize_ms"]
+    turn["transcribe"] = info["finalize_ms"]
+    turn["text"] = text
+
+    started = time.perf_counter()
+    intent = route(text)
+    turn["route"] = 1000 * (time.perf_counter() - started)
+    turn["intent"] = intent
+    if intent in COMMAND_INTENTS:
+        turn["outcome"] = "command"
+        return turn
+
+    player = TimedPlayer(EnginePlayer(engine))
+    clip = library_clip(intent) if intent in CALMING_LIBRARY else None
+    if clip:
+        run_async(player.play(clip[1]))
+        engine.wait()
+        turn["outcome"] = "library"
+    else:
+        messages = memory.with_history(build_messages(text))
+        reply, info = run_async(speak_with_deadline(client, messages, player, text, budget_s=args.budget))
+        memory.add_turn(text, reply)
+        timings = info.get("timings", {})
+        for stage in ("ttft", "ttfa"):
+            if stage in timings:
+                turn[stage] = 1000 * timings[stage]
+        turn["outcome"] = f"deadline {info['deadline']}"
+    if player.first_audio is not None:
+        turn["e2e"] = 1000 * (player.first_audio - speech_end)
+    return turn
+
+
+def summarize(turns):
+    stages = {}
+    for stage in STAGES:
+        values = [turn[stage] for turn in turns if stage in turn]
+        if values:
+            stages[stage] = {"n": len(values), **{f"p{p}": float(np.percentile(values, p)) for p in PERCENTILES}}
+    return stages
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(stages, baseline, threshold):
+    """Prints each stage against a saved run; returns the stages that regressed."""
+    regressions = []
+    print(f"\n{'stage':<12}{'old p50':>9}{'new p50':>9}{'old p95':>9}{'new p95':>9}{'change':>9}")
+    for stage, new in stages.items():
+        old = baseline["stages"].get(stage)
+        if old is None:
+            continue
+        change = (new["p95"] - old["p95"]) / max(old["p95"], 1.0)
+        slower = change > threshold and new["p95"] - old["p95"] > 1.0
+        if slower:
+            regressions.append(stage)
+        print(f"{stage:<12}{old['p50']:>9.0f}{new['p50']:>9.0f}{old['p95']:>9.0f}{new['p95']:>9.0f}"
+              f"{100 * change:>+8.0f}%{'  ❌' if slower else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", nargs="*", help="16-bit mono WAV files with a .txt reference alongside")
+    parser.add_argument("--turns", type=int, default=20, help="turns to run, cycling through the fixtures")
+    parser.add_argument("--asr", default="reference", help="'reference' or an ASR backend name")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--wake", action="store_true", help="detect the wake word first (needs the Vosk model)")
+    parser.add_argument("--first-token", type=float, default=0.4, help="mock time to first token (s)")
+    parser.add_argument("--per-token", type=float, default=0.02, help="mock time per token (s)")
+    parser.add_argument("--tts-base", type=float, default=0.25, help="mock speech latency (s)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="mean extra mock latency per response (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of mock requests answered with 429")
+    parser.add_argument("--budget", type=float, default=DEADLINE_BUDGET_S, help="deadline budget (s)")
+    parser.add_argument("--realtime", action="store_true", help="play responses at real-time pace")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="p95 slowdown that counts as a regression")
+    args = parser.parse_args()
+
+    config = MockConfig(first_token=args.first_token, per_token=args.per_token, tts_base=args.tts_base,
+                        jitter=args.jitter, error_rate=args.error_rate, seed=0)
+    server, base_url = start_server(config)
+    client = get_async_client(api_key="mock", base_url=base_url)
+    memory = SessionMemory(get_client(api_key="mock", base_url=base_url))
+    engine = PlaybackEngine(NullSink(realtime=args.realtime)).start()
+    backend = None if args.asr == "reference" else get_backend(args.asr, model_size=args.model)
+
+    turns = []
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = args.fixtures or synthetic_fixtures(tmp)
+        references = {}
+        for path in fixtures:
+            with open(os.path.splitext(path)[0] + ".txt", encoding="utf-8") as f:
+                references[path] = f.read().strip()
+
+        print(f"{'fixture':<16}{'outcome':<16}" + "".join(f"{stage:>11}" for stage in STAGES))
+        for i in range(args.turns):
+            path = fixtures[i % len(fixtures)]
+            transcribe = backend.segments if backend else reference_asr(references[path])
+            scratch_speech_cache(tempfile.mkdtemp(dir=tmp), config)
+            turn = run_turn(path, args, client, memory, engine, transcribe)
+            turns.append(turn)
+            print(f"{turn['fixture']:<16}{turn['outcome']:<16}"
+                  + "".join(f"{turn[stage]:>11.0f}" if stage in turn else f"{'-':>11}" for stage in STAGES))
+
+    engine.close()
+    server.shutdown()
+
+    stages = summarize(turns)
+    print(f"\n{'stage ms':<12}{'n':>5}" + "".join(f"{'p' + str(p):>9}" for p in PERCENTILES))
+    for stage, stats in stages.items():
+        print(f"{stage:<12}{stats['n']:>5}" + "".join(f"{stats['p' + str(p)]:>9.0f}" for p in PERCENTILES))
+    print(f"deadline: {DEADLINE_STATS.snapshot()}")
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ("output", "compare")},
+        "stages": stages,
+        "deadline": DEADLINE_STATS.snapshot(),
+        "endpoints": {endpoint: stats.snapshot() for endpoint, stats in sorted(ENDPOINT_STATS.items())},
+        "turns": turns,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(stages, json.load(f), args.threshold)
+        if regressions:
+            print(f"❌ Slower than the baseline: {', '.join(regressions)}")
+            sys.exit(1)
+        print("✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
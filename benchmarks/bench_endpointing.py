@@ -0,0 +1,77 @@
+"""Endpointing accuracy and latency on WAV fixtures.
+
+Usage:
+    python benchmarks/bench_endpointing.py [fixture.wav ...] [--realtime]
+
+Without arguments a set of synthetic fixtures (noise + voiced bursts with a
+known speech end) is generated, so the detected end can be compared against
+ground truth.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from audio_capture import WavFileSource, capture_utterance, save_wav  # noqa: E402
+
+SAMPLERATE = 16000
+
+
+def synth_utterance(speech_s, lead_s=0.3, tail_s=2.0, noise_db=-55.0, seed=0):
+    """Background noise with a voiced segment of `speech_s` seconds (with short pauses)."""
+    rng = np.random.default_rng(seed)
+    total = int((lead_s + speech_s + tail_s) * SAMPLERATE)
+    audio = rng.normal(0, 32768 * 10 ** (noise_db / 20), total)
+
+    t = np.arange(int(speech_s * SAMPLERATE)) / SAMPLERATE
+    voiced = 0.2 * 32768 * np.sin(2 * np.pi * 180 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))
+    # Short inter-word gaps that must not end the capture
+    for gap in np.arange(0.4, speech_s - 0.2, 0.6):
+        voiced[int(gap * SAMPLERATE):int((gap + 0.12) * SAMPLERATE)] = 0
+    start = int(lead_s * SAMPLERATE)
+    audio[start:start + len(voiced)] += voiced
+    return np.clip(audio, -32768, 32767).astype(np.int16), 1000 * (lead_s + speech_s)
+
+
+def synthetic_fixtures(directory):
+    fixtures = []
+    for name, speech_s, noise_db in (("short", 0.8, -55.0), ("medium", 2.5, -50.0),
+                                     ("long", 6.0, -55.0), ("noisy", 2.0, -38.0)):
+        audio, end_ms = synth_utterance(speech_s, noise_db=noise_db)
+        path = os.path.join(directory, f"{name}.wav")
+        save_wav(path, audio, SAMPLERATE)
+        fixtures.append((path, end_ms))
+    return fixtures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", nargs="*", help="16-bit mono WAV files")
+    parser.add_argument("--realtime", action="store_true", help="replay fixtures at microphone pace")
+    parser.add_argument("--hangover-ms", type=int, default=700)
+    parser.add_argument("--min-ms", type=int, default=500)
+    parser.add_argument("--max-ms", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = [(path, None) for path in args.fixtures] or synthetic_fixtures(tmp)
+
+        print(f"{'fixture':<24}{'truth ms':>10}{'speech end':>12}{'captured':>10}{'endpoint lag':>14}{'wall ms':>10}")
+        for path, truth_ms in fixtures:
+            with WavFileSource(path, realtime=args.realtime) as source:
+                audio, info = capture_utterance(source, hangover_ms=args.hangover_ms,
+                                                min_ms=args.min_ms, max_ms=args.max_ms)
+            end_ms = info["speech_end_ms"]
+            lag = info["duration_ms"] - end_ms if end_ms is not None else float("nan")
+            print(f"{os.path.basename(path):<24}"
+                  f"{truth_ms if truth_ms is not None else float('nan'):>10.0f}"
+                  f"{end_ms if end_ms is not None else float('nan'):>12.0f}"
+                  f"{info['duration_ms']:>10.0f}{lag:>14.0f}{info['wall_ms']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
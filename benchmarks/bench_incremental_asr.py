@@ -0,0 +1,53 @@
+"""Transcript latency after end of recording: one-shot Whisper vs incremental transcription.
+
+Usage:
+    python benchmarks/bench_incremental_asr.py fixture.wav [...] [--backend whisper] [--model base]
+
+Each fixture (16-bit mono speech WAV) is replayed at microphone pace through
+the endpointer. "one-shot" transcribes the whole utterance after capture
+ends, as the app used to; "incremental" decodes while the fixture is still
+playing and only finalizes the tail.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from asr import get_backend  # noqa: E402
+from audio_capture import WavFileSource, capture_utterance  # noqa: E402
+from incremental_asr import transcribe_while_recording  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", nargs="+", help="16-bit mono speech WAV files")
+    parser.add_argument("--backend", default="whisper")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--language", default="en")
+    args = parser.parse_args()
+
+    backend = get_backend(args.backend, model_size=args.model, language=args.language)
+
+    print(f"{'fixture':<24}{'audio s':>8}{'one-shot ms':>13}{'incremental ms':>16}{'decodes':>9}")
+    for path in args.fixtures:
+        with WavFileSource(path, realtime=True) as source:
+            audio, _ = capture_utterance(source)
+        started = time.perf_counter()
+        one_shot_text = backend.transcribe(audio)
+        one_shot_ms = 1000 * (time.perf_counter() - started)
+
+        with WavFileSource(path, realtime=True) as source:
+            _, info, text = transcribe_while_recording(
+                lambda on_block: capture_utterance(source, on_block=on_block),
+                backend.segments, source.samplerate)
+
+        print(f"{os.path.basename(path):<24}{len(audio) / 16000:>8.1f}{one_shot_ms:>13.0f}"
+              f"{info['finalize_ms']:>16.0f}{info['decodes']:>9}")
+        print(f"    one-shot:    {one_shot_text}")
+        print(f"    incremental: {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Intent routing: accuracy on a labelled set and throughput, router vs the old substring checks.
+
+Usage:
+    python benchmarks/bench_intents.py [benchmarks/intent_cases.tsv] [--repeat 2000]
+
+The labelled set is a tab-separated file of "text<TAB>intent" rows, with
+"none" for requests that should go to the AI. "substring" reproduces the
+checks the apps used before the router (music phrases, then the calming
+library phrases, as plain substrings). Exits with status 1 if the router
+misses any labelled request, so the set works as a regression check.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from intents import ROUTER  # noqa: E402
+
+MUSIC_PHRASES = ("relax music", "i want some relax music", "play relaxing music")
+LIBRARY_INTENTS = {
+    "breathing": ("help me breathe", "breathing exercise", "how should i breathe", "can't breathe", "breathe with me"),
+    "affirmation": ("i'm scared", "i am scared", "i'm afraid", "i can't do this", "encourage me", "i'm so tired"),
+    "relaxation": ("help me relax", "i'm so tense", "help me calm down"),
+}
+
+
+def substring_route(text):
+    text = text.lower()
+    if any(phrase in text for phrase in MUSIC_PHRASES):
+        return "music"
+    for intent, phrases in LIBRARY_INTENTS.items():
+        if any(phrase in text for phrase in phrases):
+            return intent
+    return None
+
+
+def evaluate(name, route, cases, repeat):
+    errors = []
+    for text, expected in cases:
+        got = route(text) or "none"
+        if got != expected:
+            errors.append((text, expected, got))
+
+    texts = [text for text, _ in cases]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            route(text)
+    elapsed = time.perf_counter() - started
+    per_call_us = 1e6 * elapsed / (repeat * len(texts))
+
+    print(f"{name:<10}{100 * (1 - len(errors) / len(cases)):>10.1f}%{per_call_us:>12.2f}{len(texts) * repeat / elapsed:>14.0f}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cases", nargs="?", default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                 "intent_cases.tsv"))
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    with open(args.cases, encoding="utf-8") as f:
+        cases = [tuple(line.rstrip("\n").split("\t")) for line in f.readlines()[1:] if line.strip()]
+
+    print(f"{'router':<10}{'accuracy':>11}{'µs/call':>12}{'calls/s':>14}   ({len(cases)} labelled requests)")
+    evaluate("substring", substring_route, cases, args.repeat)
+    errors = evaluate("router", ROUTER.route, cases, args.repeat)
+    for text, expected, got in errors:
+        print(f"    router miss: {text!r} expected {expected}, got {got}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
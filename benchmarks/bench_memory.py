@@ -0,0 +1,86 @@
+"""Prompt size and reply latency over a simulated 12-hour session: full history vs SessionMemory.
+
+Usage:
+    python benchmarks/bench_memory.py [--hours 12] [--turn-every-min 2] [--prefill-ms-per-1k 40]
+
+Every turn builds the prompt both ways and counts its tokens. Every
+`--sample-every` turns both prompts are also sent to the local mock server,
+whose time to answer grows with prompt length (`--prefill-ms-per-1k`). The
+session memory summarizes through the same mock server in the background.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from memory import SessionMemory, message_tokens  # noqa: E402
+from mock_openai_server import REPLY, MockConfig, start_server  # noqa: E402
+from openai_client import get_client  # noqa: E402
+from prompts import build_messages  # noqa: E402
+
+REQUESTS = [
+    "can you help me breathe through this one",
+    "i'm scared it's going to get worse",
+    "talk to me about something calm",
+    "my back hurts so much right now",
+    "how much longer do you think this will take",
+    "tell me i can do this",
+    "i feel like i can't keep going",
+    "that last one was really strong",
+    "can you remind me how to relax my shoulders",
+    "i'm so tired",
+]
+
+
+def timed_reply(client, messages):
+    started = time.perf_counter()
+    client.chat.completions.create(model="gpt-4o", messages=messages, max_tokens=100)
+    return 1000 * (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=12)
+    parser.add_argument("--turn-every-min", type=float, default=2)
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=40)
+    parser.add_argument("--sample-every", type=int, default=40)
+    args = parser.parse_args()
+
+    config = MockConfig(first_token=0.05, per_token=0.0, prefill_per_token=args.prefill_ms_per_1k / 1e6)
+    server, base_url = start_server(config)
+    client = get_client(api_key="mock", base_url=base_url)
+    memory = SessionMemory(client)
+    rng = random.Random(0)
+
+    history = []
+    overhead_us = []
+    turns = int(args.hours * 60 / args.turn_every_min)
+    print(f"{'turn':>6}{'hour':>6}{'full tokens':>13}{'bounded tokens':>16}{'full ms':>9}{'bounded ms':>12}")
+    for turn in range(1, turns + 1):
+        text = rng.choice(REQUESTS)
+        messages = build_messages(text, 110, 6, 4)
+
+        started = time.perf_counter()
+        bounded = memory.with_history(messages)
+        overhead_us.append(1e6 * (time.perf_counter() - started))
+        full = [messages[0]] + history + [messages[-1]]
+
+        if turn == 1 or turn % args.sample_every == 0 or turn == turns:
+            print(f"{turn:>6}{turn * args.turn_every_min / 60:>6.1f}{message_tokens(full):>13}"
+                  f"{message_tokens(bounded):>16}{timed_reply(client, full):>9.0f}{timed_reply(client, bounded):>12.0f}")
+
+        history += [{"role": "user", "content": text}, {"role": "assistant", "content": REPLY}]
+        memory.add_turn(text, REPLY)
+
+    server.shutdown()
+    print(f"with_history: p50 {np.percentile(overhead_us, 50):.0f} µs, max {max(overhead_us):.0f} µs per turn; "
+          f"{memory.summaries} background summaries, budget {memory.budget_tokens} tokens")
+
+
+if __name__ == "__main__":
+    main()
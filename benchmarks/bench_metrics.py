@@ -0,0 +1,59 @@
+"""Cost of the tracing layer: span() and count() with metrics disabled, enabled, and enabled with JSON logs.
+
+Usage:
+    python benchmarks/bench_metrics.py [--calls N] [--show]
+
+A turn makes a few dozen span/count calls, so even the enabled cost should
+be far below a millisecond per turn. --show prints the Prometheus output
+of the run.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import metrics  # noqa: E402
+
+# Roughly what one LLM turn records: wake, capture, transcribe, llm, first token, a few TTS sentences, ...
+CALLS_PER_TURN = 12
+
+
+def time_calls(calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        with metrics.span("transcribe"):
+            pass
+    span_ns = 1e9 * (time.perf_counter() - started) / calls
+
+    started = time.perf_counter()
+    for _ in range(calls):
+        metrics.count("doula_barge_ins_total")
+    count_ns = 1e9 * (time.perf_counter() - started) / calls
+    return span_ns, count_ns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--show", action="store_true", help="print the Prometheus exposition at the end")
+    args = parser.parse_args()
+
+    print(f"{'mode':<22}{'span ns':>10}{'count ns':>10}{'µs per turn':>13}")
+    for mode, enabled, log in (("disabled", False, ""), ("enabled", True, ""),
+                               ("enabled + JSON log", True, os.devnull)):
+        metrics.enable(enabled, log=log)
+        span_ns, count_ns = time_calls(args.calls)
+        print(f"{mode:<22}{span_ns:>10.0f}{count_ns:>10.0f}{CALLS_PER_TURN * span_ns / 1000:>13.1f}")
+
+    metrics.enable(True)
+    started = time.perf_counter()
+    text = metrics.render_prometheus()
+    print(f"render_prometheus: {1000 * (time.perf_counter() - started):.2f} ms, {len(text.splitlines())} lines")
+    if args.show:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Playback engine: mixing cost, music ducking depth and stop (barge-in) latency.
+
+Usage:
+    python benchmarks/bench_playback.py [--block-ms 20] [--trials 20]
+
+Runs against a NullSink with synthetic speech and music, so no audio device
+is needed. Stop latency is the time from engine.stop() until the engine has
+finished writing audio; an output device adds its own buffer latency on top.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from playback import NullSink, PlaybackEngine  # noqa: E402
+
+
+def tone(seconds, freq, samplerate, level=0.3):
+    t = np.arange(int(seconds * samplerate)) / samplerate
+    return (level * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def rms_db(audio):
+    return 20 * np.log10(np.sqrt(np.mean(audio ** 2)) + 1e-12)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--block-ms", type=int, default=20)
+    parser.add_argument("--trials", type=int, default=20)
+    args = parser.parse_args()
+
+    # Mixing cost: drive the scheduler by hand, as fast as it goes
+    engine = PlaybackEngine(NullSink(), block_ms=args.block_ms)
+    rate = engine.samplerate
+    engine.play_music(tone(60, 220, rate), loop=True)
+    for _ in range(20):
+        engine.enqueue(tone(3, 440, rate))
+    started = time.perf_counter()
+    while engine.speaking:
+        engine.sink.write(engine.next_block())
+    elapsed = time.perf_counter() - started
+    mixed = len(engine.sink.audio()) / rate
+    print(f"mixing: {mixed:.0f}s of audio in {1000 * elapsed:.0f} ms ({mixed / elapsed:.0f}x real time)")
+
+    # Ducking: music alone vs under speech (speech subtracted out)
+    engine = PlaybackEngine(NullSink(), block_ms=args.block_ms)
+    music = tone(4, 220, rate)
+    engine.play_music(music)
+    for _ in range(50):
+        engine.sink.write(engine.next_block())
+    speech = tone(2, 440, rate)
+    engine.enqueue(speech)
+    while engine.speaking:
+        engine.sink.write(engine.next_block())
+    mixed = engine.sink.audio()
+    alone = mixed[:rate // 2]
+    start = 50 * engine.blocksize
+    ducked = mixed[start + rate // 2:start + len(speech)] - speech[rate // 2:]
+    print(f"ducking: music {rms_db(alone):.1f} dBFS alone, {rms_db(ducked):.1f} dBFS under speech")
+
+    # Stop latency: stop at a random point during real-time playback
+    latencies = []
+    for _ in range(args.trials):
+        engine = PlaybackEngine(NullSink(realtime=True), block_ms=args.block_ms).start()
+        engine.play_music(tone(10, 220, rate))
+        engine.enqueue(tone(10, 440, rate))
+        time.sleep(random.uniform(0.1, 0.3))
+        started = time.perf_counter()
+        engine.stop()
+        # Returns once the block being written when stop() was called has finished
+        engine.wait()
+        latencies.append(1000 * (time.perf_counter() - started))
+        engine.close()
+    print(f"stop latency: p50 {np.percentile(latencies, 50):.1f} ms, max {max(latencies):.1f} ms "
+          f"({args.block_ms} ms blocks, {args.trials} trials)")
+
+
+if __name__ == "__main__":
+    main()
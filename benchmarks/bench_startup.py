@@ -0,0 +1,134 @@
+"""Cold start: time to first listen and time to fully ready, eager loading vs background warm-up.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--asr whisper|faster-whisper|simulated] [--model base]
+                                       [--wake vosk|simulated] [--asr-load-s 1.5] [--wake-load-s 0.4]
+
+Every run is a fresh Python process, so imports are measured cold.
+"eager" is the old startup order: import everything app.py used to import at
+the top (the OpenAI SDK, Vosk, the playback engine, ...), load the ASR
+model, then the Vosk model, and only then listen. "warm-up" imports app.py
+(which now defers the heavy modules), starts the background warm-up and
+listens as soon as the wake-word model is ready; "ready" is when the ASR
+model and API clients are warm too. "listen" stops at the point the
+microphone would be opened, so no audio hardware is needed.
+
+"simulated" stands in for a model that is not installed here: loading it
+sleeps for --asr-load-s / --wake-load-s seconds.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def load_asr(args):
+    if args.asr == "simulated":
+        time.sleep(args.asr_load_s)
+        return None
+    from warmup import warm_asr
+
+    return warm_asr(args.asr, model_size=args.model)
+
+
+def load_wake(args):
+    if args.wake == "simulated":
+        time.sleep(args.wake_load_s)
+        return None
+    from warmup import warm_wake_model
+
+    return warm_wake_model()
+
+
+def child_eager(args, started):
+    import openai  # noqa: F401
+    import wake_word  # noqa: F401
+    import deadline  # noqa: F401
+    import incremental_asr  # noqa: F401
+    import asr  # noqa: F401
+    import openai_client
+    import tts_cache  # noqa: F401
+    import intents  # noqa: F401
+    import playback  # noqa: F401
+    import vitals  # noqa: F401
+    import proactive  # noqa: F401
+    import profiles  # noqa: F401
+    import memory  # noqa: F401
+    import metrics  # noqa: F401
+    imported = time.perf_counter()
+
+    load_asr(args)
+    load_wake(args)
+    openai_client.get_client(api_key="mock")
+    listening = time.perf_counter()
+    return {"imports": imported - started, "listen": listening - started, "ready": listening - started}
+
+
+def child_warmup(args, started):
+    import app  # noqa: F401
+    from warmup import Warmup, warm_api
+    imported = time.perf_counter()
+
+    warmup = Warmup()
+    warmup.start("wake", lambda: load_wake(args))
+    warmup.start("asr", lambda: load_asr(args))
+    warmup.start("api", lambda: warm_api("mock"))
+    warmup.wait("wake")
+    listening = time.perf_counter()
+    for name in ("asr", "api"):
+        warmup.wait(name)
+    ready = time.perf_counter()
+    return {"imports": imported - started, "listen": listening - started, "ready": ready - started}
+
+
+def child(args):
+    started = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    try:
+        timings = (child_eager if args.child == "eager" else child_warmup)(args, started)
+    except Exception as e:
+        timings = {"error": f"{type(e).__name__}: {e}"}
+    print(json.dumps(timings))
+
+
+def run(mode, args):
+    command = [sys.executable, os.path.abspath(__file__), "--child", mode, "--asr", args.asr, "--model", args.model,
+               "--wake", args.wake, "--asr-load-s", str(args.asr_load_s), "--wake-load-s", str(args.wake_load_s)]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--asr", default="whisper")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--wake", default="vosk")
+    parser.add_argument("--asr-load-s", type=float, default=1.5, help="simulated ASR model load time (s)")
+    parser.add_argument("--wake-load-s", type=float, default=0.4, help="simulated Vosk model load time (s)")
+    parser.add_argument("--child", choices=["eager", "warm-up"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    print(f"{'mode':<10}{'imports ms':>12}{'listen ms':>12}{'ready ms':>12}")
+    for mode in ("eager", "warm-up"):
+        results = [run(mode, args) for _ in range(args.runs)]
+        errors = [result["error"] for result in results if "error" in result]
+        if errors:
+            print(f"{mode:<10}❌ {errors[0]} (try --asr simulated / --wake simulated)")
+            continue
+        medians = [1000 * statistics.median(result[stage] for result in results)
+                   for stage in ("imports", "listen", "ready")]
+        print(f"{mode:<10}" + "".join(f"{value:>12.0f}" for value in medians))
+
+
+if __name__ == "__main__":
+    main()
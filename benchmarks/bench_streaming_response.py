@@ -0,0 +1,68 @@
+"""Time-to-first-audio: one-shot completion + TTS vs the streaming sentence pipeline.
+
+Usage:
+    python benchmarks/bench_streaming_response.py [--runs N] [--first-token S] [--per-token S]
+
+Runs against benchmarks/mock_openai_server.py, so no API key or network is needed.
+Every run starts with an empty speech cache, so each sentence is synthesized.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from mock_openai_server import MockConfig, scratch_speech_cache, start_server  # noqa: E402
+from openai_client import ENDPOINT_STATS, acall_with_retries, get_async_client  # noqa: E402
+from prompts import build_messages  # noqa: E402
+from streaming_response import NullPlayer, stream_and_speak, synthesize  # noqa: E402
+
+
+async def one_shot(client, messages):
+    """The previous behaviour: full completion, then full TTS, then playback."""
+    started = time.perf_counter()
+    response = await acall_with_retries("chat", client.chat.completions.create,
+                                        model="gpt-4o", messages=messages, max_tokens=100)
+    await synthesize(client, response.choices[0].message.content)
+    return time.perf_counter() - started
+
+
+async def main_async(args):
+    config = MockConfig(first_token=args.first_token, per_token=args.per_token, error_rate=args.error_rate)
+    server, base_url = start_server(config)
+    client = get_async_client(api_key="mock", base_url=base_url)
+    messages = build_messages("I'm scared, help me relax")
+
+    baseline, streamed = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(args.runs):
+            scratch_speech_cache(tempfile.mkdtemp(dir=tmp))
+            baseline.append(await one_shot(client, messages))
+            scratch_speech_cache(tempfile.mkdtemp(dir=tmp))
+            _, timings = await stream_and_speak(client, messages, NullPlayer(realtime=False))
+            streamed.append(timings["ttfa"])
+
+    server.shutdown()
+
+    print(f"{'pipeline':<12}{'p50 TTFA ms':>14}{'max TTFA ms':>14}")
+    for name, values in (("one-shot", baseline), ("streaming", streamed)):
+        print(f"{name:<12}{1000 * statistics.median(values):>14.0f}{1000 * max(values):>14.0f}")
+    for endpoint, stats in sorted(ENDPOINT_STATS.items()):
+        print(f"{endpoint}: {stats.snapshot()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--first-token", type=float, default=0.4, help="mock time to first token (s)")
+    parser.add_argument("--per-token", type=float, default=0.02, help="mock time per token (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of mock requests answered with 429")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
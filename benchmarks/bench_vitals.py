@@ -0,0 +1,59 @@
+"""Vitals ingest throughput and snapshot cost at a realistic and a 100x sample rate.
+
+Usage:
+    python benchmarks/bench_vitals.py [--hours 2] [--rate 4] [--batch-s 1]
+
+A synthetic labor trace is fed through VitalsMonitor.ingest as fast as
+possible, in batches of `batch_s` seconds of data (how a monitor bridge
+delivers them), with the rolling analytics running once per second of data.
+At the 100x rate the ring keeps one hour (what the analytics read) instead of
+a full day, which would not fit in a bounded budget at that rate.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from vitals import HISTORY_S, RESTING_HR_WINDOW_S, VitalsMonitor, synthesize_vitals  # noqa: E402
+
+
+def run(rate_hz, hours, batch_s, history_s):
+    rows = synthesize_vitals(hours * 3600, rate_hz)
+    monitor = VitalsMonitor(rate_hz=rate_hz, history_s=history_s)
+    batch = max(1, int(batch_s * rate_hz))
+
+    started = time.perf_counter()
+    for start in range(0, len(rows), batch):
+        monitor.ingest(rows[start:start + batch])
+    elapsed = time.perf_counter() - started
+
+    reads = 100000
+    read_started = time.perf_counter()
+    for _ in range(reads):
+        monitor.snapshot()
+    snapshot_ns = 1e9 * (time.perf_counter() - read_started) / reads
+
+    print(f"{rate_hz:>8.0f}{len(rows):>12}{len(rows) / elapsed:>14.0f}{hours * 3600 / elapsed:>10.0f}x"
+          f"{monitor.ring.data.nbytes / 1e6:>10.1f}{snapshot_ns:>13.0f}")
+    return monitor.snapshot()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=2.0)
+    parser.add_argument("--rate", type=float, default=4.0, help="realistic sample rate in Hz")
+    parser.add_argument("--batch-s", type=float, default=1.0)
+    args = parser.parse_args()
+
+    print(f"{'rate Hz':>8}{'samples':>12}{'samples/s':>14}{'speed':>11}{'ring MB':>10}{'snapshot ns':>13}")
+    run(args.rate, args.hours, args.batch_s, HISTORY_S)
+    snapshot = run(100 * args.rate, args.hours, args.batch_s, RESTING_HR_WINDOW_S)
+    print(f"last snapshot: {snapshot}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""CPU cost and detection latency of the wake-word detector, full vs low-power mode.
+
+Usage:
+    python benchmarks/bench_wake_word.py [--wake fixture.wav --wake-end-ms MS] [--model PATH]
+
+Silence and noise fixtures are generated; the wake-phrase fixture must be a
+real recording of "hey doula ..." (16 kHz mono WAV) with the end of "hey"
+given by --wake-end-ms. CPU% is CPU time per second of audio, i.e. the load
+the detector would put on one core while listening in real time.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from audio_capture import WHISPER_RATE, WavFileSource, save_wav  # noqa: E402
+from wake_word import VOSK_MODEL_PATH, WakeWordListener  # noqa: E402
+
+
+def synth(kind, seconds=30, seed=0):
+    rng = np.random.default_rng(seed)
+    n = seconds * WHISPER_RATE
+    if kind == "silence":
+        audio = rng.normal(0, 20, n)
+    else:
+        # Monitor beeps and ventilation-like broadband noise
+        t = np.arange(n) / WHISPER_RATE
+        beeps = 2000 * np.sin(2 * np.pi * 1000 * t) * ((t % 1.0) < 0.1)
+        audio = rng.normal(0, 600, n) + beeps
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def run(path, model_path, low_power):
+    source = WavFileSource(path)
+    audio_s = len(source.audio) / source.samplerate
+    listener = WakeWordListener(model_path, source=source, low_power=low_power, ring_seconds=audio_s + 1).start()
+
+    cpu = time.process_time()
+    position = listener.wait_for_wake_word(position=0)
+    cpu = time.process_time() - cpu
+    listener.close()
+
+    processed_s = (position if position is not None else len(source.audio)) / source.samplerate
+    gated = listener.gate.dropped / len(source.audio) if listener.gate else 0.0
+    return {
+        "cpu_pct": 100 * cpu / max(processed_s, 1e-9),
+        "detected_ms": None if position is None else 1000 * position / source.samplerate,
+        "audio_s": audio_s,
+        "gated_pct": 100 * gated,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--wake", help="recording that starts with the wake phrase")
+    parser.add_argument("--wake-end-ms", type=float, help="end of the wake word in --wake")
+    parser.add_argument("--model", default=VOSK_MODEL_PATH)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = []
+        for kind in ("silence", "noise"):
+            path = os.path.join(tmp, f"{kind}.wav")
+            save_wav(path, synth(kind), WHISPER_RATE)
+            fixtures.append((kind, path))
+        if args.wake:
+            fixtures.append(("wake phrase", args.wake))
+
+        print(f"{'fixture':<14}{'mode':<11}{'CPU %':>8}{'gated %':>9}{'detected at ms':>16}{'latency ms':>12}")
+        for name, path in fixtures:
+            for mode, low_power in (("full", False), ("low-power", True)):
+                result = run(path, args.model, low_power)
+                detected = result["detected_ms"]
+                latency = float("nan")
+                if detected is not None and name == "wake phrase" and args.wake_end_ms is not None:
+                    latency = detected - args.wake_end_ms
+                print(f"{name:<14}{mode:<11}{result['cpu_pct']:>8.1f}{result['gated_pct']:>9.1f}"
+                      f"{detected if detected is not None else float('nan'):>16.0f}{latency:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Ward server load test: throughput and p95 latency as the number of beds grows.
+
+Usage:
+    python benchmarks/bench_ward.py [--sessions 1 2 4 8 16 32] [--duration 20] [--max-batch 1 8]
+                                    [--asr simulated|whisper|faster-whisper|vosk-fast-path] [--model base]
+
+Every simulated bed sends synthetic requests (voiced bursts, with a random
+pause before each) at microphone pace to an in-process WardServer over TCP,
+framed as a real bed frames them after its wake word: "W", the request up
+to the bed endpointer's 700 ms of trailing silence, then "U". Replies come
+from the local mock OpenAI server, with speech cached in a scratch
+directory rather than the real cache (the mock's reply is the same every
+time, so only the first one per --max-batch sweep is synthesized). Latency is measured from the end of each
+request's speech to its transcript event ("transcript") and to the first
+speech frame of the reply ("first audio"). Each --max-batch value
+is run as its own sweep, so 1 shows the unbatched baseline.
+
+"--asr simulated" stands in for the model where none is installed: a batch
+keeps its worker process busy for --decode-base + --decode-per-item x batch
+size seconds, the shape of a batched Whisper pass (a per-pass decoder cost
+shared by the batch, plus an encoder cost per 30 s window).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bench_endpointing import SAMPLERATE, synth_utterance  # noqa: E402
+from mock_openai_server import MockConfig, scratch_speech_cache, start_server  # noqa: E402
+from asr import get_backend  # noqa: E402
+from audio_capture import FRAME_MS  # noqa: E402
+from openai_client import get_async_client, get_client  # noqa: E402
+from ward_server import BatchTranscriber, WardServer, read_frame, write_frame  # noqa: E402
+
+REQUEST = "Is it normal that the pain comes in waves like this?"
+
+TOKEN = "bench"
+
+# Trailing silence the bed's endpointer waits for before it ends a request
+HANGOVER_S = 0.7
+
+
+class SimulatedDecoder:
+    """Busies the worker process like a batched decode would, and returns a fixed request."""
+
+    def __init__(self, base_s=0.2, per_item_s=0.15):
+        self.base_s = base_s
+        self.per_item_s = per_item_s
+
+    def transcribe_batch(self, audios):
+        deadline = time.perf_counter() + self.base_s + self.per_item_s * len(audios)
+        while time.perf_counter() < deadline:
+            pass
+        return [REQUEST] * len(audios)
+
+
+async def bed(index, port, duration, latencies):
+    """Streams requests for `duration` seconds and records the latency of every reply."""
+    rng = np.random.default_rng(index)
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    write_frame(writer, b"H", json.dumps({"bed": f"bed-{index}", "token": TOKEN}).encode())
+    speech_ends = deque()
+    blocksize = SAMPLERATE * FRAME_MS // 1000
+
+    async def send():
+        started = time.perf_counter()
+        while time.perf_counter() - started < duration:
+            # Nothing is sent until the bed hears the wake word
+            await asyncio.sleep(rng.uniform(0.5, 3.0))
+            audio, end_ms = synth_utterance(rng.uniform(1.0, 3.0), lead_s=0.2, tail_s=HANGOVER_S,
+                                            seed=int(rng.integers(1 << 30)))
+            woke = time.perf_counter()
+            speech_ends.append(woke + end_ms / 1000)
+            write_frame(writer, b"W", b"")
+            sent = 0
+            for i in range(0, len(audio), blocksize):
+                block = audio[i:i + blocksize]
+                write_frame(writer, b"A", block.tobytes())
+                await writer.drain()
+                sent += len(block)
+                delay = woke + sent / SAMPLERATE - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            write_frame(writer, b"U", b"")
+
+    async def receive():
+        replying_to = None
+        while True:
+            kind, payload = await read_frame(reader)
+            if kind is None:
+                return
+            now = time.perf_counter()
+            if kind == b"E" and json.loads(payload)["type"] == "transcript" and speech_ends:
+                replying_to = speech_ends.popleft()
+                latencies["transcript"].append(now - replying_to)
+            elif kind == b"P" and replying_to is not None:
+                latencies["first_audio"].append(now - replying_to)
+                replying_to = None
+
+    receiver = asyncio.create_task(receive())
+    await send()
+    # Let the last request be answered
+    await asyncio.sleep(3.0)
+    writer.close()
+    receiver.cancel()
+
+
+def percentile_ms(values, p):
+    return 1000 * float(np.percentile(values, p)) if values else float("nan")
+
+
+async def sweep(args, asr, client, sync_client):
+    for sessions in args.sessions:
+        ward = WardServer(asr, client=client, sync_client=sync_client, token=TOKEN)
+        server = await ward.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        latencies = {"transcript": [], "first_audio": []}
+        batches, utterances = asr.batches, asr.utterances
+        cpu = time.process_time()
+        await asyncio.gather(*(bed(i, port, args.duration, latencies) for i in range(sessions)))
+        server.close()
+        await server.wait_closed()
+
+        done = len(latencies["transcript"])
+        mean_batch = (asr.utterances - utterances) / max(asr.batches - batches, 1)
+        print(f"{asr.max_batch:>6}{sessions:>6}{done:>8}{done / args.duration:>8.2f}"
+              f"{percentile_ms(latencies['transcript'], 50):>10.0f}{percentile_ms(latencies['transcript'], 95):>10.0f}"
+              f"{percentile_ms(latencies['first_audio'], 50):>10.0f}{percentile_ms(latencies['first_audio'], 95):>10.0f}"
+              f"{mean_batch:>8.1f}{100 * (time.process_time() - cpu) / (args.duration + 3):>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duration", type=float, default=20, help="seconds each bed streams requests")
+    parser.add_argument("--max-batch", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--max-wait-ms", type=float, default=50)
+    parser.add_argument("--asr-workers", type=int, default=1)
+    parser.add_argument("--asr", default="simulated")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--decode-base", type=float, default=0.2, help="simulated cost per batch (s)")
+    parser.add_argument("--decode-per-item", type=float, default=0.15, help="simulated cost per utterance (s)")
+    parser.add_argument("--jitter", type=float, default=0.1, help="mean extra mock latency per response (s)")
+    args = parser.parse_args()
+
+    if args.asr == "simulated":
+        factory, options = SimulatedDecoder, {"base_s": args.decode_base, "per_item_s": args.decode_per_item}
+    else:
+        factory, options = get_backend, {"name": args.asr, "model_size": args.model}
+
+    mock, base_url = start_server(MockConfig(jitter=args.jitter, seed=0))
+
+    async def run():
+        client = get_async_client(api_key="mock", base_url=base_url)
+        sync_client = get_client(api_key="mock", base_url=base_url)
+        print(f"{'batch':>6}{'beds':>6}{'turns':>8}{'turns/s':>8}{'tx p50':>10}{'tx p95':>10}"
+              f"{'audio p50':>10}{'audio p95':>10}{'mean b':>8}{'CPU %':>8}")
+        for max_batch in args.max_batch:
+            asr = BatchTranscriber(factory, options, workers=args.asr_workers, max_batch=max_batch,
+                                   max_wait_s=args.max_wait_ms / 1000)
+            await asyncio.to_thread(asr.warm_up)
+            with tempfile.TemporaryDirectory() as tmp:
+                scratch_speech_cache(tmp)
+                await sweep(args, asr, client, sync_client)
+            asr.close()
+
+    asyncio.run(run())
+    mock.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Local stand-in for the OpenAI endpoints the pipeline uses.
+
+Serves /v1/chat/completions (plain and streamed) and /v1/audio/speech with
+configurable latency, so the response pipeline can be measured without the
+network. Point a client at it with base_url="http://127.0.0.1:<port>/v1".
+
+Usage:
+    python benchmarks/mock_openai_server.py [--port 8765]
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+REPLY = ("Take a slow, deep breath in through your nose. Hold it gently for a moment. "
+         "Now let it flow out through your mouth, softening your shoulders. "
+         "You are doing beautifully, and your body knows what to do.")
+
+
+class MockConfig:
+    """Latencies in seconds; every instance of the handler reads the same config.
+
+    `prefill_per_token` adds time to the first token for every prompt token
+    (estimated at 4 characters each), so longer prompts answer later.
+    `jitter` adds an exponentially distributed delay with that mean to the
+    first token and to each speech response, giving the long tail real
+    endpoints have.
+    """
+
+    def __init__(self, first_token=0.4, per_token=0.02, tts_base=0.25, tts_per_char=0.002,
+                 reply=REPLY, pcm_rate=24000, chars_per_second=15, error_rate=0.0, prefill_per_token=0.0,
+                 jitter=0.0, seed=None):
+        self.error_rate = error_rate
+        self.first_token = first_token
+        self.prefill_per_token = prefill_per_token
+        self.per_token = per_token
+        self.tts_base = tts_base
+        self.tts_per_char = tts_per_char
+        self.reply = reply
+        self.pcm_rate = pcm_rate
+        self.chars_per_second = chars_per_second
+        self.jitter = jitter
+        self.random = random.Random(seed)
+
+    def wait(self, seconds):
+        """Sleeps `seconds` plus jitter."""
+        if self.jitter:
+            seconds += self.random.expovariate(1.0 / self.jitter)
+        time.sleep(seconds)
+
+    def speech_pcm(self, text):
+        """Silence with roughly the duration real speech of `text` would have."""
+        seconds = max(0.3, len(text) / self.chars_per_second)
+        return np.zeros(int(seconds * self.pcm_rate), dtype=np.int16).tobytes()
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    config = MockConfig()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self._body()
+        if random.random() < self.config.error_rate:
+            self._send(429, b'{"error": {"message": "mock rate limit", "type": "rate_limit_error"}}')
+        elif self.path.endswith("/chat/completions"):
+            self._chat(body)
+        elif self.path.endswith("/audio/speech"):
+            self._speech(body)
+        else:
+            self._send(404, b'{"error": {"message": "not found"}}')
+
+    def _chat(self, body):
+        config = self.config
+        prompt_tokens = sum(len(message.get("content") or "") for message in body.get("messages", [])) // 4
+        config.wait(config.first_token + config.prefill_per_token * prompt_tokens)
+        tokens = config.reply.split(" ")
+
+        if not body.get("stream"):
+            time.sleep(config.per_token * len(tokens))
+            reply = {
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": config.reply}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                          "total_tokens": prompt_tokens + len(tokens)},
+            }
+            self._send(200, json.dumps(reply).encode())
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, token in enumerate(tokens):
+            delta = token if i == 0 else " " + token
+            self._event({"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                         "model": body.get("model", "mock"),
+                         "choices": [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]})
+            time.sleep(config.per_token)
+        self._event({"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": body.get("model", "mock"),
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _event(self, payload):
+        self._chunk(f"data: {json.dumps(payload)}\n\n".encode())
+
+    def _chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _speech(self, body):
+        config = self.config
+        text = body.get("input", "")
+        config.wait(config.tts_base + config.tts_per_char * len(text))
+        content_type = "audio/pcm" if body.get("response_format") == "pcm" else "audio/mpeg"
+        self._send(200, config.speech_pcm(text), content_type)
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients cancelling a stream (e.g. a dropped late answer) are expected
+        pass
+
+
+def scratch_speech_cache(directory, config=None):
+    """Points the speech cache at `directory`, so mock audio never lands in the real cache.
+
+    With `config`, the calming library is pre-rendered into it with that
+    config's mock speech, as `python tts_cache.py prerender` would.
+    """
+    import tts_cache
+
+    cache = tts_cache._cache = tts_cache.AudioCache(directory)
+    if config is not None:
+        for scripts in tts_cache.CALMING_LIBRARY.values():
+            for script in scripts:
+                cache.put(script, config.speech_pcm(script), fmt="pcm")
+    return cache
+
+
+def start_server(config=None, port=0):
+    """Starts the mock server in a background thread; returns (server, base_url)."""
+    handler = type("ConfiguredHandler", (MockOpenAIHandler,), {"config": config or MockConfig()})
+    server = MockServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--jitter", type=float, default=0.0, help="mean extra latency per response (s)")
+    args = parser.parse_args()
+
+    server, base_url = start_server(MockConfig(jitter=args.jitter), port=args.port)
+    print(f"Mock OpenAI server at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import os
+import threading
+
+import openai
+
+from deadline import fallback_audio, speak_with_deadline
+from incremental_asr import transcribe_while_recording
+from intents import COMMAND_INTENTS, IntentSpotter, route
+from memory import SessionMemory
+from metrics import span
+from nurse_call import NURSE_CALL, call_nurse, nurse_reply
+from openai_client import get_async_client, get_client, run_async
+from playback import BargeIn, EnginePlayer, PlaybackInterrupted, decode_audio, get_engine
+from profiles import system_prompt, tts_voice
+from prompts import build_messages
+from tts_cache import CALMING_LIBRARY, library_clip
+from vitals import get_vitals
+
+MUSIC_FILE = "relaxing_music.mp3"
+
+# What print_event() puts in front of events whose text carries no emoji of its own
+EVENT_PREFIXES = {"transcript": "📝 Transcription: ", "response": "🤖 "}
+
+
+def print_event(kind, text):
+    """The default event handler: prints every event to the console."""
+    print(EVENT_PREFIXES.get(kind, "") + text)
+
+
+class Conversation:
+    """One mother's conversation: the listen, transcribe, respond, speak turn shared by app.py and DoulaWorker.
+
+    Events go to `on_event(kind, text)`: "status", "transcript", "response",
+    "alert" and "error". Commands ("stop", "call the nurse", music) are
+    spotted by Vosk while she is still speaking and handled at once; known
+    requests play pre-rendered audio; everything else is streamed and spoken
+    sentence by sentence under the end-to-end deadline, with a local calming
+    response if nothing is audible in time. Saying "Hey Doula" while a reply
+    plays stops it and starts the next turn straight away.
+    """
+
+    def __init__(self, listener, asr, api_key=None, engine=None, vitals=None, profile=None, on_event=print_event,
+                 music_file=MUSIC_FILE):
+        self.listener = listener
+        self.asr = asr
+        self.client = get_client(api_key=api_key)
+        self.async_client = get_async_client(api_key=api_key)
+        self.engine = engine or get_engine()
+        self.vitals = vitals or get_vitals()
+        self.system_prompt = system_prompt(profile)
+        self.voice = tts_voice(profile)
+        self.memory = SessionMemory(self.client)
+        self.on_event = on_event
+        self.music_file = music_file
+
+    def turn(self, wake_position=None):
+        """Handles one request from wake word to the end of playback.
+
+        Returns the position right after the wake word that interrupted
+        playback, if any, so the next turn records from there.
+        """
+        if wake_position is None:
+            self.on_event("status", "🎤 Listening for 'Hey Doula'...")
+            with span("wake"):
+                wake_position = self.listener.wait_for_wake_word()
+        self.on_event("status", "✅ 'Hey Doula' detected! Now recording request...")
+
+        spotter = IntentSpotter(self.listener.model, self.listener.samplerate, on_intent=self.handle_command)
+        _, _, text = transcribe_while_recording(
+            lambda on_block: self.listener.record_after(wake_position, on_block=on_block, max_ms=10000),
+            self.asr.segments, on_block=spotter.feed)
+        text = text.lower()
+        if not text:
+            # A false wake or silence: nothing to answer
+            return
+        self.on_event("transcript", text)
+        intent = route(text)
+        # Already handled, unless Whisper heard more than the command
+        if spotter.intent and intent == spotter.intent:
+            return
+        if intent in COMMAND_INTENTS:
+            self.handle_command(intent)
+            return
+
+        clip = library_clip(intent, voice=self.voice) if intent in CALMING_LIBRARY else None
+        if clip:
+            # Known request: cached audio, no network round-trip
+            script, speech = clip
+            self.on_event("response", script)
+            return self.play(speech)
+
+        self.on_event("status", "🤖 Thinking...")
+        vitals = self.vitals.snapshot()
+        heart_rate, stress_level, contractions = vitals["heart_rate"], vitals["stress_level"], vitals["contractions"]
+        messages = self.memory.with_history(
+            build_messages(text, heart_rate, stress_level, contractions, self.system_prompt))
+        with BargeIn(self.listener, self.engine) as barge_in:
+            try:
+                with span("respond"):
+                    ai_text, _ = run_async(speak_with_deadline(
+                        self.async_client, messages, EnginePlayer(self.engine), text,
+                        heart_rate, stress_level, contractions,
+                        on_sentence=lambda sentence: self.on_event("status", f"🔊 {sentence}"),
+                        on_fallback=lambda script: self.on_event("response", script),
+                        voice=self.voice))
+            except PlaybackInterrupted:
+                ai_text = None
+            except openai.OpenAIError as e:
+                self.on_event("error", f"❌ AI response failed: {e}")
+                return
+
+        if ai_text:
+            self.on_event("response", ai_text)
+        # Summarizing older exchanges runs in the background while she listens
+        self.memory.add_turn(text, ai_text)
+        return barge_in.position
+
+    def handle_command(self, intent):
+        """Acts on a command intent; no transcript or AI response is needed."""
+        if intent == "stop":
+            self.on_event("status", "⏹ Stopped.")
+            self.engine.stop()
+        elif intent == "music":
+            self.play_music()
+        elif intent == "call_nurse":
+            self.call_nurse()
+
+    def call_nurse(self):
+        """Sends the nurse call and stays with her: a spoken acknowledgement at once, then breathing guidance.
+
+        Returns without waiting; if the call can't be sent, she is asked to
+        press the call button herself.
+        """
+        self.on_event("alert", "🚨 She asked for the nurse!")
+        if NURSE_CALL:
+            threading.Thread(target=self._send_nurse_call, name="nurse-call", daemon=True).start()
+        self.speak_clips(nurse_reply(bool(NURSE_CALL), self.voice))
+
+    def _send_nurse_call(self):
+        if call_nurse():
+            self.on_event("status", "✅ Nurse call sent.")
+            return
+        self.on_event("alert", "❌ The nurse call could not be sent: press the call button!")
+        self.engine.stop()
+        self.speak_clips(nurse_reply(False, self.voice))
+
+    def speak_clips(self, clips):
+        """Queues (script, pcm) clips on the engine without waiting for them to play."""
+        for script, speech in clips:
+            self.on_event("response", script)
+            self.engine.enqueue(decode_audio(speech, "pcm", self.engine.samplerate))
+
+    def play(self, data, fmt="pcm"):
+        """Plays a clip and waits until it has finished or she interrupted it.
+
+        Returns the position after the interrupting wake word, or None.
+        """
+        self.on_event("status", "🔊 Speaking...")
+        with BargeIn(self.listener, self.engine) as barge_in, span("playback"):
+            self.engine.enqueue(decode_audio(data, fmt, self.engine.samplerate))
+            self.engine.wait()
+        return barge_in.position
+
+    def play_music(self):
+        """Starts the music and returns; it keeps playing, ducked under later responses."""
+        if not os.path.exists(self.music_file):
+            self.on_event("error", "❌ Relaxing music file not found!")
+            return
+        self.on_event("status", "🎶 Playing relaxing music...")
+        self.engine.play_music(decode_audio(self.music_file, "mp3", self.engine.samplerate))
+
+    def play_local_response(self):
+        """Plays a local calming clip for a turn that could not be answered, so she is not met with silence."""
+        vitals = self.vitals.snapshot()
+        clip = fallback_audio("", vitals["heart_rate"], vitals["stress_level"], vitals["contractions"], self.voice)
+        if clip:
+            script, speech = clip
+            self.on_event("response", script)
+            self.engine.enqueue(decode_audio(speech, "pcm", self.engine.samplerate))
+            self.engine.wait()
@@ -0,0 +1,203 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+from audio_capture import resample
+from streaming_response import TTS_SAMPLERATE, stream_and_speak
+from intents import route
+from metrics import register_collector
+from tts_cache import CALMING_LIBRARY, library_clip
+
+# Time allowed from the end of the request to the first audible word
+DEADLINE_BUDGET_S = 1.5
+
+# What to do with the real answer if it arrives after the fallback started:
+# "follow" plays it after the fallback, "drop" discards it
+LATE_POLICY = "follow"
+
+
+class DeadlineStats:
+    """Counters for the end-to-end deadline."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.late_followed = 0
+        self.late_dropped = 0
+        self.fallback_unavailable = 0
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "late_followed": self.late_followed,
+                    "late_dropped": self.late_dropped, "fallback_unavailable": self.fallback_unavailable}
+
+
+DEADLINE_STATS = DeadlineStats()
+register_collector(lambda: [("doula_deadline_total", "counter", {"outcome": outcome}, value)
+                            for outcome, value in DEADLINE_STATS.snapshot().items()])
+
+
+def choose_fallback_intent(transcript, heart_rate=90, stress_level=5, contractions=3):
+    """Picks a calming script from what she asked for, or failing that from her vitals (None if unknown)."""
+    intent = route(transcript)
+    if intent in CALMING_LIBRARY:
+        return intent
+    if heart_rate is None:
+        return "relaxation"
+    if contractions >= 4 or heart_rate >= 120:
+        return "breathing"
+    if stress_level >= 7:
+        return "affirmation"
+    return "relaxation"
+
+
+def offline_tts(text, samplerate=TTS_SAMPLERATE):
+    """Synthesizes text on this machine with pyttsx3, if it is installed; returns PCM or None."""
+    try:
+        import pyttsx3
+    except ImportError:
+        return None
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "fallback.wav")
+        engine = pyttsx3.init()
+        engine.save_to_file(text, path)
+        engine.runAndWait()
+        with wave.open(path, "rb") as wavefile:
+            rate = wavefile.getframerate()
+            audio = np.frombuffer(wavefile.readframes(wavefile.getnframes()), dtype=np.int16)
+    audio = resample(audio.astype(np.float32) / 32768.0, rate, samplerate)
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+
+
+# Offline TTS renders of each intent's first script, kept for the life of the process
+_offline_clips = {}
+
+
+def local_clip(intent, voice="shimmer", render=True):
+    """Returns (script, pcm) for an intent, pre-rendered in `voice` or from offline TTS, or None if neither works.
+
+    Offline TTS takes seconds, so with render=False only clips that are
+    already rendered are returned (see prerender_fallbacks()).
+    """
+    clip = library_clip(intent, voice=voice, fmt="pcm")
+    if clip:
+        return clip
+    if intent not in _offline_clips and render:
+        script = CALMING_LIBRARY[intent][0]
+        pcm = offline_tts(script)
+        _offline_clips[intent] = (script, pcm) if pcm else None
+    return _offline_clips.get(intent)
+
+
+def prerender_fallbacks(voice="shimmer"):
+    """Renders every fallback the TTS cache lacks in `voice` with offline TTS, so no turn waits for it."""
+    for intent in CALMING_LIBRARY:
+        local_clip(intent, voice)
+    return {intent: clip is not None for intent, clip in _offline_clips.items()}
+
+
+def fallback_audio(transcript, heart_rate=90, stress_level=5, contractions=3, voice="shimmer"):
+    """Returns (script, pcm) for a local calming response, or None if nothing can be produced."""
+    return local_clip(choose_fallback_intent(transcript, heart_rate, stress_level, contractions), voice)
+
+
+class DeferredPlayer:
+    """Wraps a player and holds audio back until the scheduler decides what plays.
+
+    The first chunk sets `first_audio`; nothing reaches the real player until
+    `release()` is called, and after `drop()` everything is discarded.
+    """
+
+    def __init__(self, player):
+        self.player = player
+        self.first_audio = asyncio.Event()
+        self._released = asyncio.Event()
+        self._dropped = False
+
+    def release(self):
+        self._released.set()
+
+    def drop(self):
+        self._dropped = True
+        self._released.set()
+
+    async def play(self, pcm):
+        self.first_audio.set()
+        await self._released.wait()
+        if not self._dropped:
+            await self.player.play(pcm)
+
+    async def close(self):
+        # The scheduler owns the real player and closes it once everything has played
+        pass
+
+
+async def speak_with_deadline(client, messages, player, transcript, heart_rate=90, stress_level=5,
+                              contractions=3, budget_s=DEADLINE_BUDGET_S, policy=LATE_POLICY,
+                              on_sentence=None, on_fallback=None, voice="shimmer"):
+    """Speaks the streamed answer, or a local calming response if it misses the deadline.
+
+    Returns (answer_text, info). answer_text is None if the answer was dropped
+    or failed after the fallback played; info records "deadline" ("hit" or
+    "miss"), "fallback" (the script played, if any) and the answer's timings.
+    """
+    started = time.perf_counter()
+    deferred = DeferredPlayer(player)
+    answer = asyncio.create_task(stream_and_speak(client, messages, deferred, voice=voice, on_sentence=on_sentence))
+    first_audio = asyncio.create_task(deferred.first_audio.wait())
+    info = {"deadline": "hit", "fallback": None}
+
+    try:
+        await asyncio.wait({answer, first_audio}, timeout=budget_s, return_when=asyncio.FIRST_COMPLETED)
+
+        if deferred.first_audio.is_set():
+            DEADLINE_STATS.count("hits")
+            deferred.release()
+        else:
+            info["deadline"] = "miss"
+            DEADLINE_STATS.count("misses")
+            # Offline TTS may run on a cold fallback; keep the late answer streaming meanwhile
+            fallback = await asyncio.to_thread(fallback_audio, transcript, heart_rate, stress_level, contractions,
+                                               voice)
+            if fallback:
+                script, pcm = fallback
+                info["fallback"] = script
+                if on_fallback:
+                    on_fallback(script)
+                await player.play(pcm)
+            else:
+                DEADLINE_STATS.count("fallback_unavailable")
+
+            if policy == "drop" and fallback:
+                DEADLINE_STATS.count("late_dropped")
+                deferred.drop()
+                answer.cancel()
+                return None, info
+            DEADLINE_STATS.count("late_followed")
+            deferred.release()
+
+        try:
+            text, timings = await answer
+        except Exception:
+            if info["fallback"]:
+                # She already heard a calming response; a failed late answer is not an error for her
+                return None, info
+            raise
+        info["timings"] = timings
+        info["total"] = time.perf_counter() - started
+        return text, info
+    finally:
+        first_audio.cancel()
+        answer.cancel()
+        await player.close()
@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import deque
+
+from conversation import Conversation
+from metrics import span, start_exporter
+from proactive import ProactiveSupport
+from profiles import wants_real_time_support
+
+
+class EventBus:
+    """Thread-safe, bounded log of pipeline events.
+
+    The worker publishes; every Streamlit session reads the events newer than
+    the last sequence number it has seen, so several browser tabs can follow
+    the same worker without stealing each other's events.
+    """
+
+    def __init__(self, maxlen=200):
+        self._events = deque(maxlen=maxlen)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def publish(self, kind, **data):
+        with self._lock:
+            self._seq += 1
+            self._events.append({"seq": self._seq, "type": kind, "time": time.time(), **data})
+
+    def since(self, seq):
+        with self._lock:
+            return [event for event in self._events if event["seq"] > seq]
+
+
+class DoulaWorker:
+    """Runs the listen, transcribe, respond, speak loop in a background thread.
+
+    Each turn is a conversation.Conversation turn, the same one app.py runs;
+    its events go on `bus`: "status" (text), "transcript" (text), "response"
+    (text), "alert" (text) and "error" (text). Audio plays on this machine
+    through the playback engine.
+    Breathing guidance also starts by itself when the vitals show a
+    contraction starting, unless her profile turned real-time support off.
+    """
+
+    def __init__(self, listener, asr, api_key=None, bus=None, engine=None, vitals=None, profile=None):
+        self.bus = bus or EventBus()
+        self.conversation = Conversation(listener, asr, api_key=api_key, engine=engine, vitals=vitals,
+                                         profile=profile, on_event=lambda kind, text: self.bus.publish(kind, text=text))
+        self.engine = self.conversation.engine
+        self.vitals = self.conversation.vitals
+        self.proactive = wants_real_time_support(profile)
+        self._thread = threading.Thread(target=self._run, name="doula-worker", daemon=True)
+
+    def start(self):
+        if self.proactive:
+            ProactiveSupport(self.engine, on_support=lambda kind, script: self.bus.publish("response", text=script),
+                             voice=self.conversation.voice).attach(self.vitals)
+        start_exporter()
+        self._thread.start()
+        return self
+
+    def _run(self):
+        wake_position = None
+        while True:
+            try:
+                with span("turn"):
+                    wake_position = self.conversation.turn(wake_position)
+            except Exception as e:
+                # A failed turn (e.g. the speech model failed to load) must not end the session
+                wake_position = None
+                self.bus.publish("error", text=f"❌ Error: {e}")
+                self.conversation.play_local_response()
+                time.sleep(1)
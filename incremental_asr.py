@@ -0,0 +1,126 @@
+import threading
+import time
+
+from audio_capture import WHISPER_RATE, blocks_to_float32
+from metrics import span
+
+
+class IncrementalTranscriber:
+    """Transcribes an utterance while it is still being spoken.
+
+    `transcribe(audio, prompt)` returns [(start_s, end_s, text), ...], e.g. an
+    ASR backend's segments method.
+
+    A background worker repeatedly decodes the uncommitted part of the capture
+    buffer. Segments that end more than `commit_margin_s` before the live edge
+    are unlikely to change, so they are committed: their text becomes the
+    prompt for later decodes and their audio is never decoded again. When the
+    utterance ends, finish() only has to decode the short uncommitted tail, or
+    nothing at all if the last speculative decode already covered the end of
+    speech (the endpointer's trailing silence gives the worker time for that).
+    """
+
+    def __init__(self, transcribe, samplerate=WHISPER_RATE, step_s=0.5, commit_margin_s=1.5):
+        self.transcribe = transcribe
+        self.samplerate = samplerate
+        self.step = int(step_s * samplerate)
+        self.commit_margin = commit_margin_s
+        self.committed_text = []
+        self.committed_samples = 0
+        self.decodes = 0
+        self._blocks = []
+        self._received = 0
+        self._decoded_upto = 0
+        self._speculative = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._worker = threading.Thread(target=self._run, name="incremental-asr", daemon=True)
+        self._worker.start()
+
+    def feed(self, block):
+        """Adds a captured int16 block (capture_utterance's on_block hook)."""
+        with self._lock:
+            self._blocks.append(block)
+            self._received += len(block)
+            if self._received - self._decoded_upto >= self.step:
+                self._wake.set()
+
+    def _window(self):
+        """Returns the uncommitted audio as 16 kHz float32, and the prompt to decode it with."""
+        with self._lock:
+            audio = blocks_to_float32(self._blocks, self.samplerate)
+            upto = self._received
+            prompt = "".join(self.committed_text)
+        offset = int(self.committed_samples * WHISPER_RATE / self.samplerate)
+        return audio[offset:], prompt, upto
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if self._stopped:
+                return
+            audio, prompt, upto = self._window()
+            try:
+                segments = self.transcribe(audio, prompt)
+            except Exception:
+                # Stop decoding ahead; the final decode in finish() raises the error to the caller
+                return
+            self.decodes += 1
+            self._decoded_upto = upto
+
+            live_edge = len(audio) / WHISPER_RATE
+            with self._lock:
+                base = self.committed_samples
+                committed = 0
+                for start, end, text in segments:
+                    if end > live_edge - self.commit_margin:
+                        break
+                    self.committed_text.append(text)
+                    self.committed_samples = base + int(end * self.samplerate)
+                    committed += 1
+                self._speculative = (upto, [text for _, _, text in segments[committed:]])
+
+    def finish(self, speech_end=None):
+        """Stops the worker and returns the full transcript.
+
+        `speech_end` is the sample offset where speech ended; if the last
+        speculative decode reached it, its text is used as is.
+        """
+        self._stopped = True
+        self._wake.set()
+        self._worker.join()
+
+        if self._speculative and speech_end is not None and self._speculative[0] >= speech_end:
+            tail = self._speculative[1]
+        else:
+            audio, prompt, _ = self._window()
+            tail = [text for _, _, text in self.transcribe(audio, prompt)] if len(audio) >= WHISPER_RATE // 10 else []
+            self.decodes += 1
+        return ("".join(self.committed_text) + "".join(tail)).strip()
+
+
+def transcribe_while_recording(capture, transcribe, samplerate=WHISPER_RATE, on_block=None, **kwargs):
+    """Runs capture(on_block) with an IncrementalTranscriber attached.
+
+    `on_block`, if given, also sees every captured block (e.g. an
+    IntentSpotter). Returns (audio, info, text); info gains "finalize_ms",
+    the time from end of capture to the finished transcript.
+    """
+    transcriber = IncrementalTranscriber(transcribe, samplerate, **kwargs)
+    feed = transcriber.feed
+    if on_block is not None:
+        def feed(block):
+            transcriber.feed(block)
+            on_block(block)
+    audio, info = capture(feed)
+    started = time.perf_counter()
+    speech_end = None
+    if info.get("speech_end_ms") is not None:
+        speech_end = int(info["speech_end_ms"] * samplerate / 1000)
+    with span("transcribe"):
+        text = transcriber.finish(speech_end)
+    info["finalize_ms"] = 1000 * (time.perf_counter() - started)
+    info["decodes"] = transcriber.decodes
+    return audio, info, text
@@ -0,0 +1,139 @@
+import json
+import re
+
+# Phrases per intent, matched as whole words after normalize()
+INTENT_PATTERNS = {
+    "call_nurse": ("call the nurse", "call a nurse", "get the nurse", "get a nurse", "need the nurse", "need a nurse",
+                   "call the midwife", "get the midwife", "need the midwife", "call the doctor", "get the doctor",
+                   "need a doctor", "call for help", "get help", "someone get help", "somebody get help",
+                   "press the call button", "cant breathe", "i cant breathe"),
+    "stop": ("stop", "stop talking", "stop the music", "stop it", "be quiet", "quiet please", "enough", "pause",
+             "shut up", "turn it off", "no more"),
+    "music": ("relax music", "relaxing music", "calming music", "soft music", "play music", "play some music",
+              "put on music", "put on some music", "some music", "music please", "play something calming"),
+    "breathing": ("help me breathe", "breathing exercise", "how should i breathe", "breathe with me",
+                  "guide my breathing", "help me with my breathing", "breathe together"),
+    "affirmation": ("im scared", "i am scared", "im so scared", "i am so scared", "im afraid", "i am afraid",
+                    "i cant do this", "encourage me", "im so tired", "tell me i can do this", "i need encouragement"),
+    "relaxation": ("help me relax", "im so tense", "help me calm down", "i need to relax", "im tense",
+                   "body feels tense"),
+}
+
+# When several intents match, the first one here wins
+INTENT_PRIORITY = ("call_nurse", "stop", "music", "breathing", "affirmation", "relaxation")
+
+# Handled directly, without the LLM
+COMMAND_INTENTS = ("call_nurse", "stop", "music")
+
+# Share of the utterance's words (fillers aside) an intent's phrases must make up for it to count,
+# by intent or by phrase: "stop" is only a command when it is the whole request ("i cant stop
+# shaking" and "[unk] stop" are not). Vosk partials never trigger these, only final results.
+# Library clips replace the AI's answer, so they need the phrase to be most of the request ("im scared,
+# is my baby okay" needs the AI), and a bare "get help" must not fire inside "how do i get help breathing".
+MIN_COVERAGE = {"stop": 1.0, "get help": 1.0, "breathing": 0.5, "affirmation": 0.5, "relaxation": 0.5}
+
+# A phrase within this many words after a negation doesn't count ("i dont need a nurse", "dont stop")
+NEGATIONS = frozenset(("dont", "not", "never", "doesnt", "didnt", "wont"))
+NEGATION_WINDOW = 2
+
+# Words that don't change what a short command means
+FILLER_WORDS = frozenset(("please", "okay", "ok", "now", "just", "so", "right", "thats", "that", "its", "oh", "um",
+                          "uh", "hey", "doula", "can", "you", "could", "would", "me", "for", "the", "a", "some",
+                          "lets", "and", "do", "with", "this", "one", "really", "well"))
+
+
+def normalize(text):
+    """Lowercase words without punctuation; apostrophes are dropped so "can't" and "cant" match alike."""
+    text = text.lower().replace("'", "").replace("’", "")
+    return " ".join(re.sub(r"[^a-z0-9 ]", " ", text).split())
+
+
+class IntentRouter:
+    """Maps a transcript (Whisper text or a Vosk result) to an intent, or None.
+
+    All phrases are compiled into one alternation, longest first, so a
+    transcript is scanned once however many phrases there are. With
+    partial=True (a Vosk partial, which may grow into a longer request),
+    intents and phrases with a minimum coverage are left out.
+    """
+
+    def __init__(self, patterns=INTENT_PATTERNS, priority=INTENT_PRIORITY, min_coverage=MIN_COVERAGE,
+                 fillers=FILLER_WORDS, negations=NEGATIONS):
+        self.intent_of = {normalize(phrase): intent for intent, phrases in patterns.items() for phrase in phrases}
+        alternatives = sorted(self.intent_of, key=len, reverse=True)
+        self.pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, alternatives)) + r")\b")
+        self.rank = {intent: rank for rank, intent in enumerate(priority)}
+        self.min_coverage = min_coverage
+        self.fillers = fillers
+        self.negations = negations
+
+    def route(self, text, partial=False):
+        text = normalize(text)
+        words = text.split()
+        matches = []
+        covered = {}
+        for match in self.pattern.finditer(text):
+            phrase = match.group()
+            intent = self.intent_of[phrase]
+            need = self.min_coverage.get(phrase, self.min_coverage.get(intent))
+            if need is not None and partial:
+                continue
+            start = len(text[:match.start()].split())
+            if self.negations.intersection(words[max(0, start - NEGATION_WINDOW):start]):
+                continue
+            covered.setdefault(intent, set()).update(range(start, start + len(phrase.split())))
+            matches.append((intent, need))
+
+        content = [i for i, word in enumerate(words) if word not in self.fillers] or range(len(words))
+        best = None
+        for intent, need in matches:
+            if need is not None and sum(i in covered[intent] for i in content) < need * len(content):
+                continue
+            if best is None or self.rank[intent] < self.rank[best]:
+                best = intent
+        return best
+
+    def phrases(self, intents):
+        return [phrase for phrase, intent in self.intent_of.items() if intent in intents]
+
+
+ROUTER = IntentRouter()
+
+
+def route(text, partial=False):
+    return ROUTER.route(text, partial)
+
+
+class IntentSpotter:
+    """Listens for command phrases in live audio, ahead of Whisper.
+
+    A Vosk recognizer restricted to the command phrases is fed the request
+    as it is recorded (capture_utterance's on_block hook) and checked on
+    every partial result, so a command is acted on within a block or two of
+    being said. Commands that must be the whole request ("stop") wait for a
+    final result. `on_intent(intent)` is called once, from the capture thread.
+    Whisper has the last word: callers skip the reply only if route() of the
+    transcript agrees.
+    """
+
+    def __init__(self, model, samplerate, on_intent=None, router=ROUTER, intents=COMMAND_INTENTS):
+        import vosk
+
+        self.router = router
+        self.intents = intents
+        self.on_intent = on_intent
+        self.intent = None
+        self.recognizer = vosk.KaldiRecognizer(model, samplerate, json.dumps(router.phrases(intents) + ["[unk]"]))
+
+    def feed(self, block):
+        if self.intent is not None:
+            return
+        if self.recognizer.AcceptWaveform(block.tobytes()):
+            text, partial = json.loads(self.recognizer.Result()).get("text", ""), False
+        else:
+            text, partial = json.loads(self.recognizer.PartialResult()).get("partial", ""), True
+        intent = self.router.route(text, partial) if text else None
+        if intent in self.intents:
+            self.intent = intent
+            if self.on_intent:
+                self.on_intent(intent)
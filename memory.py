@@ -0,0 +1,151 @@
+import threading
+
+from openai_client import call_with_retries
+
+# Hard cap on the whole prompt: system prompt, summary, recent turns and the new request
+MEMORY_BUDGET_TOKENS = 1500
+# Exchanges kept word for word; older ones are folded into the running summary
+KEEP_TURNS = 6
+# Exchanges held while summaries can't be made (e.g. offline); beyond this the oldest are dropped
+MAX_TURNS = 100
+SUMMARY_MAX_TOKENS = 200
+SUMMARY_MODEL = "gpt-4o-mini"
+
+SUMMARY_PROMPT = (
+    "You keep a running summary of a conversation between a mother in labor and her calming birth "
+    "assistant. Update the summary with the new exchanges. Keep what helps later replies: how she is "
+    "feeling, what she asked for, what calmed her and what did not. Plain sentences, under 120 words."
+)
+
+_encoding = None
+_encoding_loaded = False
+
+
+def get_encoding():
+    """The tiktoken encoding, loaded on first use, or None.
+
+    Loading it may download the BPE file, so it is not done at import, and
+    any failure (not installed, no network) falls back to the estimate.
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except ImportError:
+            pass
+        except Exception as e:
+            print(f"❌ tiktoken unavailable ({e}); estimating prompt tokens")
+    return _encoding
+
+
+def count_tokens(text):
+    """Exact with tiktoken installed, otherwise the usual ~4 characters per token estimate."""
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+def message_tokens(messages):
+    # Each message carries a few tokens of role and framing overhead
+    return sum(count_tokens(message["content"]) + 4 for message in messages)
+
+
+class SessionMemory:
+    """Conversation history for one labor session, under a hard token budget.
+
+    with_history() inserts the running summary and the most recent
+    exchanges between the system prompt and the new request, dropping the
+    oldest exchanges that don't fit `budget_tokens`. Exchanges beyond the
+    last `keep_turns` are folded into the summary by a background thread, so
+    summarizing never delays a reply; until it has run they are still sent
+    verbatim if they fit.
+    """
+
+    def __init__(self, client=None, budget_tokens=MEMORY_BUDGET_TOKENS, keep_turns=KEEP_TURNS,
+                 model=SUMMARY_MODEL, summarize=None):
+        self.client = client
+        self.budget_tokens = budget_tokens
+        self.keep_turns = keep_turns
+        self.model = model
+        self.summarize = summarize or self._summarize
+        self.summary = ""
+        self.summaries = 0
+        self._turns = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker = None
+
+    def with_history(self, messages):
+        """Returns [system, summary, recent exchanges..., request] within the token budget."""
+        system, request = messages[0], messages[-1]
+        with self._lock:
+            summary, turns = self.summary, list(self._turns)
+
+        context = []
+        if summary:
+            context.append({"role": "system", "content": f"Earlier in this session: {summary}"})
+        available = self.budget_tokens - message_tokens([system, request] + context)
+        recent = []
+        for user_text, reply in reversed(turns):
+            exchange = [{"role": "user", "content": user_text}, {"role": "assistant", "content": reply}]
+            cost = message_tokens(exchange)
+            if cost > available:
+                break
+            recent[:0] = exchange
+            available -= cost
+        return [system] + context + recent + [request]
+
+    def add_turn(self, user_text, reply):
+        """Records a finished exchange and folds old ones into the summary in the background."""
+        if not reply:
+            return
+        with self._lock:
+            self._turns.append((user_text, reply))
+            del self._turns[:-MAX_TURNS]
+            due = len(self._turns) > self.keep_turns
+        if due:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="session-memory", daemon=True)
+                self._worker.start()
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                self.compact()
+            except Exception as e:
+                print(f"❌ Session summary failed, will retry after the next turn: {e}")
+
+    def compact(self):
+        """Folds every exchange older than the last `keep_turns` into the summary."""
+        with self._lock:
+            summary = self.summary
+            old = self._turns[:max(0, len(self._turns) - self.keep_turns)]
+        if not old:
+            return
+        summary = self.summarize(summary, old)
+        with self._lock:
+            # Only appends happen meanwhile, so the folded exchanges are still the oldest ones
+            self.summary = summary
+            del self._turns[:len(old)]
+            self.summaries += 1
+
+    def _summarize(self, summary, turns):
+        exchanges = "\n".join(f"Mother: {user_text}\nAssistant: {reply}" for user_text, reply in turns)
+        response = call_with_retries(
+            "chat", self.client.chat.completions.create,
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Summary so far: {summary or '(none)'}\n\nNew exchanges:\n{exchanges}"},
+            ],
+            temperature=0.3,
+            max_tokens=SUMMARY_MAX_TOKENS,
+        )
+        return (response.choices[0].message.content or summary).strip()
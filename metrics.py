@@ -0,0 +1,298 @@
+"""Tracing and metrics for the live pipeline: stage spans, counters and gauges.
+
+Disabled unless DOULA_METRICS=1; span() and count() then return at once.
+When enabled, every span ends up in a per-stage latency histogram and, with
+DOULA_METRICS_LOG set (a path, or "-" for stderr), as one JSON line. The
+Prometheus text format is served on DOULA_METRICS_PORT (/metrics, bound to
+DOULA_METRICS_HOST, localhost by default) and/or rewritten every
+DOULA_METRICS_INTERVAL seconds to DOULA_METRICS_FILE (for node_exporter's
+textfile collector).
+
+Modules that already keep their own counters (openai_client, deadline,
+tts_cache, asr, playback) register a collector that is read only at export.
+"""
+import bisect
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_ENABLED = os.getenv("DOULA_METRICS", "") not in ("", "0")
+METRICS_LOG = os.getenv("DOULA_METRICS_LOG", "")
+METRICS_FILE = os.getenv("DOULA_METRICS_FILE", "")
+METRICS_PORT = int(os.getenv("DOULA_METRICS_PORT", "0"))
+# Local only by default; set to 0.0.0.0 (or an interface address) for a remote Prometheus
+METRICS_HOST = os.getenv("DOULA_METRICS_HOST", "127.0.0.1")
+METRICS_INTERVAL_S = float(os.getenv("DOULA_METRICS_INTERVAL", "15"))
+
+# Stage latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_METRIC = "doula_stage_duration_seconds"
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Counters, gauges and stage histograms, plus collectors read at export time."""
+
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.collectors = []
+        self._lock = threading.Lock()
+        self._log = None
+        self._cpu = (time.perf_counter(), time.process_time())
+
+    def count(self, name, n=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, stage, seconds, **labels):
+        key = (STAGE_METRIC, tuple(sorted({"stage": stage, **labels}.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def log(self, event, **fields):
+        """Writes one JSON line to DOULA_METRICS_LOG, if set."""
+        if not METRICS_LOG:
+            return
+        line = json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str)
+        with self._lock:
+            if self._log is None:
+                self._log = sys.stderr if METRICS_LOG == "-" else open(METRICS_LOG, "a", buffering=1,
+                                                                       encoding="utf-8")
+            self._log.write(line + "\n")
+
+    def process_samples(self):
+        """CPU and memory of this process; CPU percent is averaged since the previous export."""
+        now, cpu = time.perf_counter(), time.process_time()
+        with self._lock:
+            last_now, last_cpu = self._cpu
+            self._cpu = (now, cpu)
+        samples = [
+            ("process_cpu_seconds_total", "counter", {}, cpu),
+            ("doula_cpu_percent", "gauge", {}, 100 * (cpu - last_cpu) / max(now - last_now, 1e-9)),
+        ]
+        rss = resident_bytes()
+        if rss is not None:
+            samples.append(("process_resident_memory_bytes", "gauge", {}, rss))
+        return samples
+
+    def samples(self):
+        """Every metric as (name, type, labels, value); histograms as (name, "histogram", labels, Histogram)."""
+        with self._lock:
+            samples = [(name, "counter", dict(labels), value) for (name, labels), value in self.counters.items()]
+            samples += [(name, "gauge", dict(labels), value) for (name, labels), value in self.gauges.items()]
+            samples += [(name, "histogram", dict(labels), histogram)
+                        for (name, labels), histogram in self.histograms.items()]
+            collectors = list(self.collectors)
+        samples += self.process_samples()
+        for collect in collectors:
+            try:
+                samples.extend(collect())
+            except Exception as e:
+                print(f"❌ Metrics collector failed: {e}")
+        return samples
+
+
+REGISTRY = Registry()
+
+
+def resident_bytes():
+    """Current RSS from /proc on Linux, else the peak from getrusage, else None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Span:
+    """Times one stage; use span() rather than creating these directly."""
+
+    __slots__ = ("stage", "labels", "started")
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, kind, error, traceback):
+        seconds = time.perf_counter() - self.started
+        REGISTRY.observe(self.stage, seconds, **self.labels)
+        # Cancellation (e.g. a dropped late answer) is not an error
+        if kind is not None and issubclass(kind, Exception):
+            REGISTRY.count("doula_errors_total", stage=self.stage, error=kind.__name__)
+        REGISTRY.log("span", stage=self.stage, ms=round(1000 * seconds, 2), error=kind and kind.__name__,
+                     **self.labels)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, error, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(stage, **labels):
+    """Context manager timing a pipeline stage ("wake", "capture", "transcribe", "llm", "tts", ...).
+
+    An exception escaping the span is counted in doula_errors_total.
+    """
+    if not METRICS_ENABLED:
+        return _NULL_SPAN
+    return Span(stage, labels)
+
+
+def observe(stage, seconds, **labels):
+    """Records a duration measured elsewhere (e.g. time to first token) as a stage."""
+    if METRICS_ENABLED:
+        REGISTRY.observe(stage, seconds, **labels)
+        REGISTRY.log("span", stage=stage, ms=round(1000 * seconds, 2), **labels)
+
+
+def count(name, n=1, **labels):
+    if METRICS_ENABLED:
+        REGISTRY.count(name, n, **labels)
+        REGISTRY.log("count", name=name, n=n, **labels)
+
+
+def set_gauge(name, value, **labels):
+    if METRICS_ENABLED:
+        REGISTRY.set_gauge(name, value, **labels)
+
+
+def register_collector(collect):
+    """Adds collect() -> [(name, "counter" | "gauge", labels, value), ...], read at every export."""
+    with REGISTRY._lock:
+        REGISTRY.collectors.append(collect)
+
+
+def enable(enabled=True, log=None):
+    """Turns metrics on or off at runtime; `log` also sets the JSON log destination."""
+    global METRICS_ENABLED, METRICS_LOG
+    METRICS_ENABLED = enabled
+    if log is not None:
+        METRICS_LOG = log
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items())) + "}"
+
+
+def render_prometheus(registry=REGISTRY):
+    """Returns every metric in the Prometheus text exposition format."""
+    lines = []
+    typed = set()
+    for name, kind, labels, value in sorted(registry.samples(), key=lambda sample: sample[0]):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} {kind}")
+        if kind != "histogram":
+            lines.append(f"{name}{_labels(labels)} {value}")
+            continue
+        cumulative = 0
+        for bound, n in zip(value.buckets + (float("inf"),), value.counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+        lines.append(f"{name}_sum{_labels(labels)} {value.sum}")
+        lines.append(f"{name}_count{_labels(labels)} {value.count}")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path=METRICS_FILE):
+    """Writes the metrics atomically, so a scraper never reads half a file."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus())
+    os.replace(tmp, path)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_exporter_started = False
+_exporter_lock = threading.Lock()
+
+
+def start_exporter(port=METRICS_PORT, path=METRICS_FILE, interval_s=METRICS_INTERVAL_S, host=METRICS_HOST):
+    """Starts the /metrics endpoint and/or the textfile writer once per process, if metrics are enabled."""
+    global _exporter_started
+    with _exporter_lock:
+        if _exporter_started or not METRICS_ENABLED:
+            return
+        _exporter_started = True
+    if port:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        print(f"📈 Metrics at http://{host}:{port}/metrics")
+    if path:
+        def run():
+            while True:
+                try:
+                    write_textfile(path)
+                except OSError as e:
+                    print(f"❌ Writing metrics to {path} failed: {e}")
+                time.sleep(interval_s)
+        threading.Thread(target=run, name="metrics-file", daemon=True).start()
@@ -0,0 +1,64 @@
+"""Nurse call: escalates "call the nurse" (and "I can't breathe") to the ward's nurse-call system.
+
+Set DOULA_NURSE_CALL to where calls go:
+    "http://..." or "https://..."  POST {"bed", "text", "time"} as JSON to the ward's nurse-call gateway
+    "serial:<device>"              close the bed's call-button relay, wired to the RTS line of a
+                                   serial port, for half a second (pip install pyserial)
+DOULA_BED names the bed in calls from app.py and the Streamlit app; the
+ward server sends each bed's own id. Without DOULA_NURSE_CALL no one is
+contacted, and she is asked to press the call button herself.
+"""
+import json
+import os
+import time
+import urllib.request
+
+from metrics import count
+
+NURSE_CALL = os.getenv("DOULA_NURSE_CALL", "")
+BED = os.getenv("DOULA_BED", "")
+
+NURSE_CALL_TIMEOUT_S = 3.0
+RELAY_PULSE_S = 0.5
+
+
+def call_nurse(bed=None, text="", target=NURSE_CALL):
+    """Sends a nurse call; returns True once the call system has accepted it, False if it could not be sent."""
+    if not target:
+        count("doula_nurse_calls_total", result="unconfigured")
+        return False
+    kind, _, device = target.partition(":")
+    try:
+        if kind in ("http", "https"):
+            body = json.dumps({"bed": bed or BED or None, "text": text, "time": time.time()}).encode()
+            request = urllib.request.Request(target, data=body, headers={"Content-Type": "application/json"})
+            # Raises for anything but a 2xx answer
+            urllib.request.urlopen(request, timeout=NURSE_CALL_TIMEOUT_S).close()
+        elif kind == "serial":
+            import serial
+
+            with serial.Serial(device) as port:
+                port.rts = True
+                time.sleep(RELAY_PULSE_S)
+                port.rts = False
+        else:
+            raise ValueError(f"unknown target '{target}'. Use http(s)://... or serial:<device>")
+    except (ImportError, OSError, ValueError) as e:
+        print(f"❌ Nurse call failed: {e}")
+        count("doula_nurse_calls_total", result="failed")
+        return False
+    count("doula_nurse_calls_total", result="sent")
+    return True
+
+
+def nurse_reply(sent, voice="shimmer"):
+    """The clips she hears after asking for the nurse, as [(script, pcm), ...]: an acknowledgement, then breathing.
+
+    With sent=False she is asked to press the call button herself. Only
+    pre-rendered clips are used, so the reply starts at once.
+    """
+    from deadline import local_clip
+
+    clips = [local_clip("nurse_called" if sent else "nurse_unreachable", voice, render=False),
+             local_clip("breathing", voice, render=False)]
+    return [clip for clip in clips if clip]
@@ -0,0 +1,185 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+import openai
+
+from metrics import register_collector
+
+# Per-stage timeout budgets in seconds (connect, then whole request)
+TIMEOUTS = {
+    "chat": openai.Timeout(8.0, connect=2.0),
+    "tts": openai.Timeout(10.0, connect=2.0),
+}
+
+# A server-requested Retry-After is honoured up to this fraction of the stage's timeout;
+# waiting longer would only turn a slow answer into a missing one
+RETRY_AFTER_SHARE = 0.25
+
+# Longest wait between attempts when the stage has no timeout
+MAX_BACKOFF_S = 4.0
+
+# Errors worth retrying; everything else (bad key, bad request) fails fast
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+_lock = threading.Lock()
+_clients = {}
+_loop = None
+
+
+class EndpointStats:
+    """Latency and error counters for one endpoint ("chat", "tts", ...)."""
+
+    def __init__(self, window=500):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds=None, error=False, retry=False):
+        with self._lock:
+            if retry:
+                self.retries += 1
+                return
+            self.calls += 1
+            if error:
+                self.errors += 1
+            if seconds is not None:
+                self.latencies.append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            latencies = sorted(self.latencies)
+        summary = {"calls": self.calls, "errors": self.errors, "retries": self.retries}
+        if latencies:
+            summary["p50_ms"] = 1000 * latencies[len(latencies) // 2]
+            summary["p95_ms"] = 1000 * latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+            summary["max_ms"] = 1000 * latencies[-1]
+        return summary
+
+
+ENDPOINT_STATS = {}
+
+
+def endpoint_stats(endpoint):
+    with _lock:
+        return ENDPOINT_STATS.setdefault(endpoint, EndpointStats())
+
+
+def _collect_endpoint_stats():
+    samples = []
+    for endpoint, stats in list(ENDPOINT_STATS.items()):
+        labels = {"endpoint": endpoint}
+        summary = stats.snapshot()
+        samples += [("doula_api_calls_total", "counter", labels, summary["calls"]),
+                    ("doula_api_errors_total", "counter", labels, summary["errors"]),
+                    ("doula_api_retries_total", "counter", labels, summary["retries"])]
+        if "p95_ms" in summary:
+            samples.append(("doula_api_latency_p95_seconds", "gauge", labels, summary["p95_ms"] / 1000))
+    return samples
+
+
+register_collector(_collect_endpoint_stats)
+
+
+def get_client(api_key=None, base_url=None):
+    """Returns the process-wide OpenAI client.
+
+    One client means one connection pool, so TLS sessions are kept alive
+    between turns. Retries are handled by call_with_retries, not the SDK.
+    """
+    cache_key = ("sync", api_key, base_url)
+    with _lock:
+        if cache_key not in _clients:
+            _clients[cache_key] = openai.OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        return _clients[cache_key]
+
+
+def get_async_client(api_key=None, base_url=None):
+    """Returns the process-wide AsyncOpenAI client; use it from run_async coroutines."""
+    cache_key = ("async", api_key, base_url)
+    with _lock:
+        if cache_key not in _clients:
+            _clients[cache_key] = openai.AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+        return _clients[cache_key]
+
+
+def run_async(coro):
+    """Runs a coroutine on the shared background event loop and waits for the result.
+
+    The async client's connections belong to one event loop, so every turn
+    must run on the same loop instead of a fresh asyncio.run().
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="openai-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
+
+
+def backoff_delay(attempt, base=0.25, cap=MAX_BACKOFF_S):
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def retry_delay(error, attempt, timeout=None):
+    """Seconds to wait before the next attempt: Retry-After if given, else backoff, capped by the stage budget."""
+    budget = getattr(timeout, "read", timeout)
+    cap = RETRY_AFTER_SHARE * budget if budget else MAX_BACKOFF_S
+    return min(_retry_after(error) or backoff_delay(attempt), cap)
+
+
+def call_with_retries(endpoint, fn, *args, retries=2, **kwargs):
+    """Calls an OpenAI SDK method with the stage's timeout and jittered retries."""
+    stats = endpoint_stats(endpoint)
+    kwargs.setdefault("timeout", TIMEOUTS.get(endpoint))
+    for attempt in range(retries + 1):
+        started = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except RETRYABLE_ERRORS as e:
+            if attempt == retries:
+                stats.record(time.perf_counter() - started, error=True)
+                raise
+            stats.record(retry=True)
+            time.sleep(retry_delay(e, attempt, kwargs["timeout"]))
+        except openai.OpenAIError:
+            stats.record(time.perf_counter() - started, error=True)
+            raise
+        else:
+            stats.record(time.perf_counter() - started)
+            return result
+
+
+async def acall_with_retries(endpoint, fn, *args, retries=2, **kwargs):
+    """Async counterpart of call_with_retries."""
+    stats = endpoint_stats(endpoint)
+    kwargs.setdefault("timeout", TIMEOUTS.get(endpoint))
+    for attempt in range(retries + 1):
+        started = time.perf_counter()
+        try:
+            result = await fn(*args, **kwargs)
+        except RETRYABLE_ERRORS as e:
+            if attempt == retries:
+                stats.record(time.perf_counter() - started, error=True)
+                raise
+            stats.record(retry=True)
+            await asyncio.sleep(retry_delay(e, attempt, kwargs["timeout"]))
+        except openai.OpenAIError:
+            stats.record(time.perf_counter() - started, error=True)
+            raise
+        else:
+            stats.record(time.perf_counter() - started)
+            return result
@@ -0,0 +1,329 @@
+import asyncio
+import io
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from pydub import AudioSegment
+
+from audio_capture import resample
+from metrics import count, register_collector
+from streaming_response import TTS_SAMPLERATE
+
+# Audio is mixed and written in blocks this long; a stop takes effect within one block
+BLOCK_MS = 20
+
+# Background music level on its own, and while speech is playing over it
+MUSIC_GAIN_DB = -6
+DUCK_GAIN_DB = -20
+
+# Music ducks quickly when speech starts and comes back slowly once it ends
+DUCK_ATTACK_MS = 60
+DUCK_RELEASE_MS = 600
+
+
+def db_to_gain(db):
+    return 10 ** (db / 20)
+
+
+def decode_audio(data, fmt="mp3", samplerate=TTS_SAMPLERATE):
+    """Decodes a clip (bytes or a path) into a mono float32 array at `samplerate`.
+
+    "pcm" is OpenAI's raw 24 kHz 16-bit format; any other format is decoded with pydub.
+    """
+    if isinstance(data, str):
+        with open(data, "rb") as f:
+            data = f.read()
+    if fmt == "pcm":
+        audio = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+        return resample(audio, TTS_SAMPLERATE, samplerate)
+
+    segment = AudioSegment.from_file(io.BytesIO(data), format=fmt).set_channels(1).set_sample_width(2)
+    audio = np.array(segment.get_array_of_samples(), dtype=np.float32) / 32768.0
+    return resample(audio, segment.frame_rate, samplerate)
+
+
+def mix_block(speech, music, gain_from, gain_to):
+    """Mixes speech at full level over music whose gain ramps linearly from gain_from to gain_to."""
+    block = np.zeros(max(len(speech), len(music)), dtype=np.float32)
+    block[:len(music)] = music * np.linspace(gain_from, gain_to, len(music), dtype=np.float32)
+    block[:len(speech)] += speech
+    return np.clip(block, -1.0, 1.0, out=block)
+
+
+class SoundDeviceSink:
+    """Writes float32 blocks to the default output device through one open stream."""
+
+    def __init__(self, samplerate=TTS_SAMPLERATE, blocksize=0):
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self._stream = None
+
+    def write(self, block):
+        if self._stream is None:
+            # Imported here so the engine also runs (against other sinks) without PortAudio
+            import sounddevice as sd
+
+            self._stream = sd.OutputStream(samplerate=self.samplerate, channels=1, dtype="float32",
+                                           blocksize=self.blocksize, latency="low")
+            self._stream.start()
+        self._stream.write(block)
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+
+
+class NullSink:
+    """Sink that keeps the mixed blocks instead of playing them, for tests and benchmarks.
+
+    With realtime=True each write takes as long as the block would take to play.
+    """
+
+    def __init__(self, samplerate=TTS_SAMPLERATE, realtime=False):
+        self.samplerate = samplerate
+        self.realtime = realtime
+        self.blocks = []
+
+    def write(self, block):
+        self.blocks.append(block)
+        if self.realtime:
+            time.sleep(len(block) / self.samplerate)
+
+    def audio(self):
+        return np.concatenate(self.blocks) if self.blocks else np.zeros(0, dtype=np.float32)
+
+    def close(self):
+        pass
+
+
+class PlaybackEngine:
+    """Plays queued speech, with optional background music ducked underneath.
+
+    Clips are decoded into memory before they are queued, so the engine knows
+    exactly when speech ends: wait() returns once everything queued has been
+    written to the sink. A background thread mixes and writes `block_ms`
+    blocks, so stop() (used for barge-in) silences playback within one block
+    plus the output device's latency. next_block() is the complete mixing and
+    scheduling step and can be driven by hand against a NullSink.
+    """
+
+    def __init__(self, sink=None, samplerate=TTS_SAMPLERATE, block_ms=BLOCK_MS, music_gain_db=MUSIC_GAIN_DB,
+                 duck_gain_db=DUCK_GAIN_DB, attack_ms=DUCK_ATTACK_MS, release_ms=DUCK_RELEASE_MS):
+        self.samplerate = samplerate
+        self.blocksize = int(samplerate * block_ms / 1000)
+        self.sink = sink or SoundDeviceSink(samplerate, self.blocksize)
+        self.music_gain = db_to_gain(music_gain_db)
+        self.duck_gain = db_to_gain(duck_gain_db)
+        self._attack_step = (self.music_gain - self.duck_gain) * block_ms / attack_ms
+        self._release_step = (self.music_gain - self.duck_gain) * block_ms / release_ms
+        self.stops = 0
+        self._gain = self.music_gain
+        self._speech = deque()
+        self._speech_offset = 0
+        self._music = None
+        self._music_pos = 0
+        self._music_loop = False
+        self._writing_speech = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="playback", daemon=True)
+            self._thread.start()
+        return self
+
+    def enqueue(self, speech):
+        """Queues a float32 speech clip at the engine's sample rate to play after the ones before it."""
+        with self._cond:
+            if len(speech):
+                self._speech.append(speech)
+                self._cond.notify_all()
+
+    def play_music(self, music, loop=False):
+        """Starts background music (float32 at the engine's rate) from the beginning; None stops it."""
+        with self._cond:
+            self._music, self._music_pos, self._music_loop = music, 0, loop
+            self._cond.notify_all()
+
+    def stop(self):
+        """Drops all queued speech and the music, e.g. when she interrupts."""
+        with self._cond:
+            self._speech.clear()
+            self._speech_offset = 0
+            self._music = None
+            self.stops += 1
+            self._cond.notify_all()
+
+    @property
+    def queued_seconds(self):
+        """Speech still waiting to be played."""
+        with self._cond:
+            samples = sum(len(clip) for clip in self._speech) - self._speech_offset
+        return samples / self.samplerate
+
+    @property
+    def speaking(self):
+        with self._cond:
+            return bool(self._speech) or self._writing_speech
+
+    def wait(self, timeout=None):
+        """Blocks until all queued speech has played; returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._speech and not self._writing_speech, timeout)
+
+    def next_block(self):
+        """Mixes the next block, or returns None when there is nothing to play."""
+        with self._cond:
+            if not self._speech and self._music is None:
+                self._gain = self.music_gain
+                return None
+            speech = self._take_speech()
+            music = self._take_music()
+            self._writing_speech = len(speech) > 0
+
+            # Stay ducked while more speech is queued, so short gaps between sentences don't pump the music
+            gain_from = self._gain
+            if len(speech) or self._speech:
+                self._gain = max(self.duck_gain, gain_from - self._attack_step)
+            else:
+                self._gain = min(self.music_gain, gain_from + self._release_step)
+            return mix_block(speech, music, gain_from, self._gain)
+
+    def _take_speech(self):
+        parts, needed = [], self.blocksize
+        while needed and self._speech:
+            clip = self._speech[0]
+            part = clip[self._speech_offset:self._speech_offset + needed]
+            parts.append(part)
+            needed -= len(part)
+            self._speech_offset += len(part)
+            if self._speech_offset >= len(clip):
+                self._speech.popleft()
+                self._speech_offset = 0
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+    def _take_music(self):
+        if self._music is None:
+            return np.zeros(0, dtype=np.float32)
+        part = self._music[self._music_pos:self._music_pos + self.blocksize]
+        self._music_pos += len(part)
+        if self._music_pos >= len(self._music):
+            if self._music_loop:
+                rest = self._music[:self.blocksize - len(part)]
+                part = np.concatenate([part, rest])
+                self._music_pos = len(rest)
+            else:
+                self._music = None
+        return part
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._speech or self._music is not None)
+                if self._closed:
+                    return
+            block = self.next_block()
+            if block is not None:
+                self.sink.write(block)
+            with self._cond:
+                self._writing_speech = False
+                self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self.sink.close()
+
+
+class PlaybackInterrupted(Exception):
+    """Raised into the response pipeline when playback was stopped by a barge-in."""
+
+
+class EnginePlayer:
+    """The streaming_response player interface on top of a PlaybackEngine.
+
+    play() decodes and queues a PCM chunk without waiting for it to be heard,
+    so synthesis of later sentences is never held up; close() waits until
+    everything queued has played. Once the engine has been stopped, play()
+    raises PlaybackInterrupted so the rest of the answer is not generated.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._stops = engine.stops
+
+    async def play(self, pcm):
+        if self.engine.stops != self._stops:
+            raise PlaybackInterrupted()
+        self.engine.enqueue(decode_audio(pcm, "pcm", self.engine.samplerate))
+
+    async def close(self):
+        await asyncio.to_thread(self.engine.wait)
+
+
+class BargeIn:
+    """Stops the engine when the wake word is heard while it is playing.
+
+    Use as a context manager around playback. Afterwards `position` is the
+    stream position right after the wake word (the next request starts
+    there), or None if she didn't interrupt. While speech is playing only the
+    full "hey doula" counts and the energy gate is raised, so the speaker's
+    own echo doesn't cut the reply short.
+    """
+
+    def __init__(self, listener, engine):
+        self.listener = listener
+        self.engine = engine
+        self.position = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.position = None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="barge-in", daemon=True)
+        self._thread.start()
+        return self
+
+    def _watch(self):
+        position = self.listener.wait_for_wake_word(stop=self._stop, strict=lambda: self.engine.speaking)
+        if position is not None:
+            self.position = position
+            self.engine.stop()
+            count("doula_barge_ins_total")
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Returns the process-wide playback engine on the default output device, starting it on first use."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = PlaybackEngine().start()
+        return _engine
+
+
+def _collect_engine_stats():
+    if _engine is None:
+        return []
+    return [("doula_playback_queue_seconds", "gauge", {}, _engine.queued_seconds),
+            ("doula_playback_stops_total", "counter", {}, _engine.stops)]
+
+
+register_collector(_collect_engine_stats)
@@ -0,0 +1,195 @@
+"""Proactive support: calming audio as soon as a contraction starts, without waiting for the wake word.
+
+Usage:
+    python proactive.py replay vitals.csv [--speed N] [--cooldown 120]
+
+`replay` runs a recorded vitals CSV through the event detector on a
+simulated clock (as fast as possible unless --speed is given) and prints
+every event and the support it would have triggered.
+"""
+import argparse
+import math
+
+from deadline import local_clip
+from metrics import count
+from playback import decode_audio
+from tts_cache import CALMING_LIBRARY
+from vitals import CONTRACTION_RISE, CsvReplaySource
+
+# Conditions must hold this long before an event fires, so sensor glitches don't trigger audio
+DEBOUNCE_S = 2.0
+# Vitals time after a support clip during which no new one starts
+COOLDOWN_S = 120.0
+# Heart rate this far above its 5-minute average is a spike
+HR_SPIKE_BPM = 20.0
+
+TOCO_SMOOTH_S = 2.0
+HR_FAST_S = 5.0
+HR_SLOW_S = 300.0
+# Resting uterine tone is followed quickly downwards and slowly upwards
+BASELINE_DOWN_S = 10.0
+BASELINE_UP_S = 300.0
+
+SUPPORT_INTENTS = {"contraction_onset": "breathing", "hr_spike": "affirmation"}
+
+
+def smoothing(dt, tau):
+    """Exponential smoothing factor for a sample dt seconds after the previous one."""
+    return 1.0 - math.exp(-dt / tau)
+
+
+class VitalsEventDetector:
+    """Detects contraction onsets and ends, and heart-rate spikes, one sample at a time.
+
+    Every update is constant time: exponential moving averages for toco,
+    its resting baseline and heart rate, plus debounce timers with
+    hysteresis (an event ends when its signal falls below half the
+    threshold). Time comes from the samples' own timestamps, so a replayed
+    CSV behaves exactly like the live stream.
+    """
+
+    def __init__(self, rise=CONTRACTION_RISE, spike_bpm=HR_SPIKE_BPM, debounce_s=DEBOUNCE_S):
+        self.rise = rise
+        self.spike_bpm = spike_bpm
+        self.debounce_s = debounce_s
+        self.contracting = False
+        self.spiking = False
+        self._t = None
+        self._contraction_since = None
+        self._spike_since = None
+
+    def update(self, t, heart_rate, toco):
+        """Adds one sample and returns the events it completed, as [(kind, t), ...]."""
+        if self._t is None:
+            self._t = t
+            self.toco = self.toco_baseline = toco
+            self.hr_fast = self.hr_slow = heart_rate
+            return []
+        dt = max(t - self._t, 0.0)
+        self._t = t
+        self.toco += (toco - self.toco) * smoothing(dt, TOCO_SMOOTH_S)
+        self.hr_fast += (heart_rate - self.hr_fast) * smoothing(dt, HR_FAST_S)
+        self.hr_slow += (heart_rate - self.hr_slow) * smoothing(dt, HR_SLOW_S)
+
+        events = []
+        rise = self.toco - self.toco_baseline
+        if not self.contracting:
+            tau = BASELINE_DOWN_S if rise < 0 else BASELINE_UP_S
+            self.toco_baseline += (self.toco - self.toco_baseline) * smoothing(dt, tau)
+        if rise >= self.rise:
+            if self._contraction_since is None:
+                self._contraction_since = t
+            if not self.contracting and t - self._contraction_since >= self.debounce_s:
+                self.contracting = True
+                events.append(("contraction_onset", t))
+        elif rise < self.rise / 2:
+            self._contraction_since = None
+            if self.contracting:
+                self.contracting = False
+                events.append(("contraction_end", t))
+
+        excess = self.hr_fast - self.hr_slow
+        if excess >= self.spike_bpm:
+            if self._spike_since is None:
+                self._spike_since = t
+            if not self.spiking and t - self._spike_since >= self.debounce_s:
+                self.spiking = True
+                # A faster heart rate is expected during a contraction; only report spikes outside one
+                if not self.contracting:
+                    events.append(("hr_spike", t))
+        elif excess < self.spike_bpm / 2:
+            self._spike_since = None
+            self.spiking = False
+        return events
+
+    def process(self, rows):
+        """Runs a batch of (time_s, heart_rate, toco) rows through update()."""
+        events = []
+        for t, heart_rate, toco in rows.tolist():
+            events.extend(self.update(t, heart_rate, toco))
+        return events
+
+
+class ProactiveSupport:
+    """Starts a calming clip on vitals events; no wake word, ASR or LLM is involved.
+
+    Subscribed to a VitalsMonitor, it runs on the ingest thread and queues the
+    pre-rendered clip on the playback engine the moment an event fires.
+    Nothing new starts while the engine is already speaking, or within
+    `cooldown_s` (vitals time) of the last clip. Clips are in her TTS
+    `voice`, so they sound like the rest of the conversation. `clip(intent)`
+    returns (script, pcm) or None; without an engine, clips are only recorded
+    in `triggered`, which is how replays are checked.
+    """
+
+    def __init__(self, engine=None, detector=None, cooldown_s=COOLDOWN_S, clip=None, on_support=None,
+                 voice="shimmer"):
+        self.engine = engine
+        self.detector = detector or VitalsEventDetector()
+        self.cooldown_s = cooldown_s
+        # Never synthesizes on the ingest thread: only cached or pre-rendered clips play
+        self.clip = clip or (lambda intent: local_clip(intent, voice, render=False))
+        self.on_support = on_support
+        self.triggered = []
+        self.skipped = 0
+        self._last = None
+
+    def attach(self, monitor):
+        monitor.subscribe(self.process)
+        return self
+
+    def process(self, rows):
+        for event in self.detector.process(rows):
+            self.handle(event)
+
+    def handle(self, event):
+        kind, t = event
+        intent = SUPPORT_INTENTS.get(kind)
+        if intent is None:
+            return
+        if (self._last is not None and t - self._last < self.cooldown_s) or (self.engine and self.engine.speaking):
+            self.skipped += 1
+            count("doula_proactive_total", kind=kind, result="skipped")
+            return
+        try:
+            clip = self.clip(intent)
+        except Exception as e:
+            print(f"❌ Proactive support failed: {e}")
+            return
+        if clip is None:
+            return
+
+        self._last = t
+        script, pcm = clip
+        if self.engine is not None:
+            self.engine.enqueue(decode_audio(pcm, "pcm", self.engine.samplerate))
+        self.triggered.append((t, kind, script))
+        count("doula_proactive_total", kind=kind, result="played")
+        if self.on_support:
+            self.on_support(kind, script)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    replay = subcommands.add_parser("replay", help="replay a vitals CSV through the event detector")
+    replay.add_argument("csv")
+    replay.add_argument("--speed", type=float, default=None, help="replay rate vs real time (default: simulated)")
+    replay.add_argument("--cooldown", type=float, default=COOLDOWN_S)
+    args = parser.parse_args()
+
+    if args.command == "replay":
+        support = ProactiveSupport(cooldown_s=args.cooldown, clip=lambda intent: (CALMING_LIBRARY[intent][0], b""))
+        detector = support.detector
+        for batch in CsvReplaySource(args.csv, speed=args.speed).batches():
+            for kind, t in detector.process(batch):
+                print(f"{t:>9.1f}s  {kind}")
+                before = len(support.triggered)
+                support.handle((kind, t))
+                if len(support.triggered) > before:
+                    print(f"{'':>12}🧘 {support.triggered[-1][2]}")
+        print(f"✅ {len(support.triggered)} support clips, {support.skipped} skipped by cooldown")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import functools
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+from prompts import SYSTEM_PROMPT
+
+PROFILE_DB = os.getenv("DOULA_PROFILE_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles.db"))
+
+# Questionnaire languages Whisper can be pinned to, and the TTS voice used for each
+LANGUAGE_CODES = {"English": "en", "Spanish": "es"}
+TTS_VOICES = {"en": "shimmer", "es": "nova"}
+DEFAULT_VOICE = "shimmer"
+
+# Questionnaire answers that go into the prompt, in order, with their short labels
+PROMPT_FIELDS = (
+    ("preferred_name", "Call her"),
+    ("pronouns", "Pronouns"),
+    ("tone", "Tone"),
+    ("humor", "Humor"),
+    ("support_preferences", "Support she prefers"),
+    ("real_time_support", "Wants support during contractions"),
+    ("sound_preference", "Background sounds"),
+    ("affirmations", "Phrases she likes"),
+    ("fears", "Fears and concerns"),
+    ("avoid", "Avoid"),
+    ("helpful_before", "Helped in a previous labor"),
+    ("first_labor", "First labor"),
+    ("partner_support", "Involve her partner"),
+    ("cultural_preferences", "Cultural or spiritual preferences"),
+    ("additional_requests", "Other requests"),
+)
+
+
+def connect(path=PROFILE_DB):
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE IF NOT EXISTS profiles "
+                       "(id INTEGER PRIMARY KEY, answers TEXT NOT NULL, updated REAL NOT NULL)")
+    return connection
+
+
+def save_profile(answers, path=PROFILE_DB):
+    """Stores the questionnaire answers as a new profile and returns its id."""
+    with closing(connect(path)) as connection, connection:
+        cursor = connection.execute("INSERT INTO profiles (answers, updated) VALUES (?, ?)",
+                                    (json.dumps(answers, sort_keys=True), time.time()))
+        return cursor.lastrowid
+
+
+def load_profile(profile_id=None, path=PROFILE_DB):
+    """Returns a saved profile (the latest by default) as {"id", "updated", "answers"}, or None."""
+    if not os.path.exists(path):
+        return None
+    with closing(connect(path)) as connection:
+        if profile_id is None:
+            row = connection.execute("SELECT id, answers, updated FROM profiles ORDER BY id DESC LIMIT 1").fetchone()
+        else:
+            row = connection.execute("SELECT id, answers, updated FROM profiles WHERE id = ?",
+                                     (profile_id,)).fetchone()
+    if row is None:
+        return None
+    return {"id": row[0], "answers": json.loads(row[1]), "updated": row[2]}
+
+
+def languages(profile):
+    """Returns the Whisper language codes chosen in the questionnaire ("Other" is not pinnable)."""
+    if not profile:
+        return []
+    return [LANGUAGE_CODES[name] for name in profile["answers"].get("language", []) if name in LANGUAGE_CODES]
+
+
+def asr_options(profile):
+    """get_backend() options for a profile: one known language is pinned, several mean auto-detect."""
+    if not profile or not profile["answers"].get("language"):
+        return {}
+    codes = languages(profile)
+    return {"language": codes[0] if codes and len(profile["answers"]["language"]) == 1 else None}
+
+
+def wants_real_time_support(profile):
+    """Whether breathing guidance may start by itself on contractions (yes unless she said no)."""
+    return not profile or profile["answers"].get("real_time_support") != "No"
+
+
+def tts_voice(profile):
+    codes = languages(profile)
+    return TTS_VOICES.get(codes[0], DEFAULT_VOICE) if codes else DEFAULT_VOICE
+
+
+def compile_system_prompt(answers):
+    """The shared system prompt followed by a compact summary of her answers.
+
+    The generic instructions always come first and are byte-identical for
+    every profile, so the provider can cache that prefix.
+    """
+    lines = []
+    names = answers.get("language", [])
+    if names:
+        lines.append(f"- Speak {' or '.join(names)}; reply in the language she uses")
+    for key, label in PROMPT_FIELDS:
+        value = answers.get(key)
+        if isinstance(value, list):
+            value = "; ".join(value)
+        if value and str(value).strip():
+            lines.append(f"- {label}: {str(value).strip()}")
+    if not lines:
+        return SYSTEM_PROMPT
+    return SYSTEM_PROMPT.rstrip() + "\n\nAbout her (from her questionnaire):\n" + "\n".join(lines) + "\n"
+
+
+@functools.lru_cache(maxsize=32)
+def _compiled(answers_json):
+    return compile_system_prompt(json.loads(answers_json))
+
+
+def system_prompt(profile):
+    """Returns the compiled system prompt for a profile, compiling each distinct profile once."""
+    if not profile:
+        return SYSTEM_PROMPT
+    return _compiled(json.dumps(profile["answers"], sort_keys=True))
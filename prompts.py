@@ -0,0 +1,27 @@
+SYSTEM_PROMPT = """
+You are a calming birth assistant AI designed to provide emotional and mental support during childbirth.
+
+- Your focus is on *calming techniques, relaxation, and mindfulness*.
+- *Do NOT provide medical advice or diagnose conditions*.
+- *DO NOT mention labor status, medical risks, or suggest medical actions*.
+- *Keep responses concise and within 30 seconds of speech (~100 tokens).*
+- If a user expresses stress, anxiety, or discomfort, respond with *soothing breathing exercises, positive affirmations, and relaxation techniques*.
+- Encourage the user to *focus on deep breaths, softening their body, and maintaining a calm state of mind*.
+- If a user asks medical-related questions (e.g., "Is my baby okay?"), gently *redirect them to a healthcare provider* and reinforce *calmness and reassurance*.
+"""
+
+
+def build_messages(user_text, heart_rate=90, stress_level=5, contractions=3, system_prompt=SYSTEM_PROMPT):
+    """Builds the chat messages for one turn from the transcript and vitals.
+
+    The system prompt comes first and per-turn data last, so the prompt prefix is identical every turn.
+    With heart_rate=None (no vitals available) the vitals are left out rather than made up.
+    """
+    if heart_rate is None:
+        content = f"{user_text}."
+    else:
+        content = f"My heart rate is {heart_rate} BPM, my stress level is {stress_level}/10, and I have {contractions} contractions per 10 minutes. Also, {user_text}."
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": content}
+    ]
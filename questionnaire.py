@@ -1,6 +1,7 @@
 import streamlit as st
 import base64
 import os
+from profiles import save_profile
 
 # ✅ Set page configuration (MUST be the first Streamlit command)
 st.set_page_config(page_title="AI Doula Personalization Questionnaire")
@@ -32,6 +33,11 @@ else:
 st.title("🍼 AI Doula Personalization Questionnaire")
 st.write("Helping us create a calming and supportive experience for you during labor.")
 
+def selected(options):
+    """Drops the "Other" placeholder (its specified text was added instead) and empty entries."""
+    return [option for option in options if option and option != "Other"]
+
+
 def main():
     # General Information
     st.header("1. General Information")
@@ -45,12 +51,13 @@ def main():
     st.write("*(You can select multiple options where applicable)*")
     language = st.multiselect("What language(s) would you like AI.doula to use? (Multiple selections allowed)", ["English", "Spanish", "Other"])
     if "Other" in language:
-        st.text_input("Please specify other language")
+        other_language = st.text_input("Please specify other language")
+        language = selected([other_language if name == "Other" else name for name in language])
 
     tone = st.radio("What tone do you find most comforting?",
                     ["Warm and gentle", "Encouraging and empowering", "Calm and neutral", "Other"])
     if tone == "Other":
-        st.text_input("Please specify the tone")
+        tone = st.text_input("Please specify the tone")
 
     humor = st.radio("Would you like AI.doula to use humor when appropriate?",
                      ["Yes, I appreciate light humor", "A little is fine", "No, I prefer a serious tone"])
@@ -69,16 +76,17 @@ def main():
         ],
     )
     if "Other" in support_preferences:
-        st.text_input("Please specify other support preference")
+        support_preferences = support_preferences + [st.text_input("Please specify other support preference")]
 
     real_time_support = st.radio("Would you like AI.doula to provide real-time support during contractions?",
                                  ["Yes", "No"])
-    st.text_area("Are there any specific affirmations or comforting phrases you'd like to hear?")
+    affirmations = st.text_area("Are there any specific affirmations or comforting phrases you'd like to hear?")
 
     # Sensory Preferences
     st.header("4. Sensory Preferences")
     sensory_preference = st.radio("Do you prefer AI.doula to guide you with:",
                                   ["Spoken words only", "Background calming sounds/music"])
+    sound_preference = []
     if sensory_preference == "Background calming sounds/music":
         sound_preference = st.multiselect(
             "If using sounds, what kind do you prefer? (Multiple selections allowed)", 
@@ -90,21 +98,23 @@ def main():
             ],
         )
         if "Other" in sound_preference:
-            st.text_input("Please specify other sound preference")
+            sound_preference = sound_preference + [st.text_input("Please specify other sound preference")]
 
     # Personalization Based on Past Experiences
     st.header("5. Personalization Based on Past Experiences")
     first_labor = st.radio("Is this your first labor?", ["Yes", "No, I've given birth before"])
+    helpful_before = ""
     if first_labor == "No, I've given birth before":
-        st.text_area("If you've given birth before, is there anything you found helpful last time?")
-    st.text_area("Is there anything you'd like to avoid based on past experiences?")
-    st.text_area("Do you have any fears or concerns about labor that AI.doula should be aware of?")
+        helpful_before = st.text_area("If you've given birth before, is there anything you found helpful last time?")
+    avoid = st.text_area("Is there anything you'd like to avoid based on past experiences?")
+    fears = st.text_area("Do you have any fears or concerns about labor that AI.doula should be aware of?")
 
     # Partner & Support System
     st.header("6. Partner & Support System")
     include_partner = st.radio(
         "Would you like AI.doula to offer words of encouragement for your birth partner/support person as well?",
         ["Yes", "No"])
+    partner_support = []
     if include_partner == "Yes":
         partner_support = st.multiselect(
             "If yes, how would you like AI.doula to involve them? (Multiple selections allowed)", 
@@ -115,15 +125,36 @@ def main():
             ],
         )
         if "Other" in partner_support:
-            st.text_input("Please specify other support preference for partner")
+            partner_support = partner_support + [st.text_input("Please specify other support preference for partner")]
 
     # Additional Customization
     st.header("7. Additional Customization")
-    st.text_area("Do you have any specific cultural or spiritual preferences AI.doula should be aware of?")
-    st.text_area("Any additional preferences or requests?")
+    cultural_preferences = st.text_area(
+        "Do you have any specific cultural or spiritual preferences AI.doula should be aware of?")
+    additional_requests = st.text_area("Any additional preferences or requests?")
 
     # Submit Button
     if st.button("Submit Questionnaire"):
+        save_profile({
+            "full_name": full_name,
+            "preferred_name": preferred_name,
+            "pronouns": pronouns,
+            "due_date": due_date.isoformat() if due_date else "",
+            "language": language,
+            "tone": tone,
+            "humor": humor,
+            "support_preferences": selected(support_preferences),
+            "real_time_support": real_time_support,
+            "affirmations": affirmations,
+            "sound_preference": selected(sound_preference),
+            "first_labor": "yes" if first_labor == "Yes" else "no",
+            "helpful_before": helpful_before,
+            "avoid": avoid,
+            "fears": fears,
+            "partner_support": selected(partner_support),
+            "cultural_preferences": cultural_preferences,
+            "additional_requests": additional_requests,
+        })
         st.success("✅ Thank you for completing the questionnaire! Your preferences have been saved.")
 
 if __name__ == "__main__":
@@ -0,0 +1,138 @@
+import asyncio
+import re
+import time
+
+from metrics import observe, span
+from openai_client import acall_with_retries
+from tts_cache import acached_speech
+
+# OpenAI's "pcm" speech format: raw 24 kHz 16-bit little-endian mono
+TTS_SAMPLERATE = 24000
+
+# A sentence ends at . ! ? or … followed by whitespace, or at a newline
+SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+class SentenceChunker:
+    """Splits a stream of text deltas into complete sentences.
+
+    Sentences shorter than `min_chars` are held back and joined with the next
+    one, so TTS is not called for fragments like "Okay." on their own.
+    """
+
+    def __init__(self, min_chars=12):
+        self.min_chars = min_chars
+        self._buffer = ""
+
+    def feed(self, delta):
+        """Adds a text delta and returns any sentences it completed."""
+        self._buffer += delta
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self._buffer):
+            candidate = self._buffer[start:match.start()].strip()
+            if len(candidate) >= self.min_chars:
+                sentences.append(candidate)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self):
+        """Returns whatever text is left once the stream has ended."""
+        rest, self._buffer = self._buffer.strip(), ""
+        return [rest] if rest else []
+
+
+class NullPlayer:
+    """Player that discards audio but keeps real-time pacing, for tests and benchmarks."""
+
+    def __init__(self, samplerate=TTS_SAMPLERATE, realtime=True):
+        self.samplerate = samplerate
+        self.realtime = realtime
+        self.chunks = []
+
+    async def play(self, pcm):
+        self.chunks.append(pcm)
+        if self.realtime:
+            await asyncio.sleep(len(pcm) / 2 / self.samplerate)
+
+    async def close(self):
+        pass
+
+
+async def synthesize(client, sentence, voice="shimmer", model="tts-1"):
+    """Returns raw PCM speech for one sentence; sentences said before come from the speech cache."""
+    return await acached_speech(client, sentence, voice, model, "pcm")
+
+
+async def stream_and_speak(client, messages, player, model="gpt-4o", voice="shimmer", tts_model="tts-1",
+                           max_tokens=100, on_sentence=None):
+    """Streams a chat completion, speaking each sentence as soon as it is complete.
+
+    TTS requests for later sentences run while earlier ones are still playing,
+    and audio is played strictly in sentence order. Returns the full text and
+    timings in seconds from the start of the request ("ttft": first token,
+    "ttfa": first audio handed to the player, "total": playback finished).
+    """
+    started = time.perf_counter()
+    timings = {}
+    pending = asyncio.Queue()
+    chunker = SentenceChunker()
+    text = []
+
+    async def produce():
+        with span("llm"):
+            stream = await acall_with_retries(
+                "chat", client.chat.completions.create,
+                model=model,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=max_tokens,
+                stream=True,
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content or ""
+                if delta and "ttft" not in timings:
+                    timings["ttft"] = time.perf_counter() - started
+                    observe("llm_first_token", timings["ttft"])
+                text.append(delta)
+                for sentence in chunker.feed(delta):
+                    await queue_sentence(sentence)
+        for sentence in chunker.flush():
+            await queue_sentence(sentence)
+        await pending.put(None)
+
+    async def queue_sentence(sentence):
+        if on_sentence:
+            on_sentence(sentence)
+        # Start synthesis now; the consumer awaits the tasks in order
+        await pending.put(asyncio.create_task(synthesize(client, sentence, voice, tts_model)))
+
+    async def consume():
+        while (task := await pending.get()) is not None:
+            pcm = await task
+            if "ttfa" not in timings:
+                timings["ttfa"] = time.perf_counter() - started
+                observe("first_audio", timings["ttfa"])
+            await player.play(pcm)
+
+    tasks = [asyncio.create_task(produce()), asyncio.create_task(consume())]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Sentences already sent to TTS must not keep running (and billing) after a barge-in or a failure
+        unplayed = []
+        while not pending.empty():
+            task = pending.get_nowait()
+            if task is not None:
+                task.cancel()
+                unplayed.append(task)
+        await asyncio.gather(*unplayed, return_exceptions=True)
+        await player.close()
+
+    timings["total"] = time.perf_counter() - started
+    return "".join(text), timings
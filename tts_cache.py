@@ -0,0 +1,202 @@
+"""Content-addressed cache of synthesized speech, plus a library of calming scripts.
+
+Usage:
+    python tts_cache.py prerender [--voice shimmer | --profile ID] [--model tts-1] [--formats pcm mp3]
+
+prerender renders in the voice of her saved profile (the latest, or --profile),
+the voice her streamed replies use, unless --voice names one.
+"""
+import argparse
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from metrics import register_collector, span
+from openai_client import acall_with_retries, call_with_retries, get_client
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio_cache")
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Curated scripts that cover most turns; pre-rendered so they play with no network round-trip
+CALMING_LIBRARY = {
+    "breathing": [
+        "Let's breathe together. Breathe in slowly through your nose for four counts. "
+        "Hold gently. Now breathe out through your mouth for six counts, letting your shoulders drop.",
+        "Place a hand on your belly. Breathe in and feel it rise. Breathe out and feel it soften. "
+        "Again, in slowly, and out even more slowly. You are doing this beautifully.",
+        "Breathe in calm, breathe out tension. In through the nose, out through soft lips. "
+        "Each breath brings you closer to meeting your baby.",
+    ],
+    "affirmation": [
+        "You are strong, you are safe, and you are not alone. Your body knows exactly what to do.",
+        "Every wave brings you closer to your baby. You can do this, one breath at a time.",
+        "It's okay to feel scared. You are surrounded by care, and you are doing an amazing job.",
+    ],
+    "relaxation": [
+        "Let your jaw soften. Let your shoulders melt away from your ears. "
+        "Unclench your hands and let the bed hold your weight.",
+        "Imagine a warm wave moving slowly from the top of your head down to your toes, "
+        "relaxing every muscle it touches.",
+    ],
+    # Said the moment she asks for the nurse (see nurse_call.py), before breathing guidance
+    "nurse_called": [
+        "I'm calling the nurse for you right now. I'm here with you. Let's breathe together while help comes.",
+    ],
+    "nurse_unreachable": [
+        "I can't reach the nurse from here. Please press your call button, or ask someone near you to get help. "
+        "I'm here with you. Let's breathe together.",
+    ],
+}
+
+def cache_key(text, voice, model, fmt):
+    return hashlib.sha256(f"{model}\0{voice}\0{fmt}\0{text}".encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    """Size-bounded on-disk cache keyed by (text, voice, model, format).
+
+    A file's mtime is its last use; once the cache grows past max_bytes the
+    least recently used files are evicted.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        # Oldest first; moved to the end on every hit
+        entries = sorted((entry.stat().st_mtime, entry.name, entry.stat().st_size)
+                         for entry in os.scandir(directory) if entry.is_file() and not entry.name.endswith(".tmp"))
+        self._sizes = OrderedDict((name, size) for _, name, size in entries)
+        self.total_bytes = sum(self._sizes.values())
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def get(self, text, voice="shimmer", model="tts-1", fmt="mp3"):
+        name = f"{cache_key(text, voice, model, fmt)}.{fmt}"
+        with self._lock:
+            if name not in self._sizes:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._sizes.move_to_end(name)
+            os.utime(self._path(name))
+        with open(self._path(name), "rb") as f:
+            return f.read()
+
+    def put(self, text, audio, voice="shimmer", model="tts-1", fmt="mp3"):
+        name = f"{cache_key(text, voice, model, fmt)}.{fmt}"
+        tmp = self._path(name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(audio)
+        os.replace(tmp, self._path(name))
+        with self._lock:
+            self.total_bytes += len(audio) - self._sizes.pop(name, 0)
+            self._sizes[name] = len(audio)
+            while self.total_bytes > self.max_bytes and len(self._sizes) > 1:
+                oldest, size = self._sizes.popitem(last=False)
+                self.total_bytes -= size
+                os.remove(self._path(oldest))
+
+
+_cache = None
+
+
+def get_cache():
+    """Returns the process-wide audio cache."""
+    global _cache
+    if _cache is None:
+        _cache = AudioCache()
+    return _cache
+
+
+def _collect_cache_stats():
+    if _cache is None:
+        return []
+    return [("doula_tts_cache_total", "counter", {"result": "hit"}, _cache.hits),
+            ("doula_tts_cache_total", "counter", {"result": "miss"}, _cache.misses),
+            ("doula_tts_cache_bytes", "gauge", {}, _cache.total_bytes)]
+
+
+register_collector(_collect_cache_stats)
+
+
+def cached_speech(client, text, voice="shimmer", model="tts-1", fmt="mp3"):
+    """Returns speech audio for text, synthesizing it only on a cache miss."""
+    cache = get_cache()
+    audio = cache.get(text, voice, model, fmt)
+    if audio is None:
+        with span("tts"):
+            response = call_with_retries("tts", client.audio.speech.create,
+                                         model=model, voice=voice, input=text, response_format=fmt)
+        audio = response.content
+        cache.put(text, audio, voice, model, fmt)
+    return audio
+
+
+async def acached_speech(client, text, voice="shimmer", model="tts-1", fmt="pcm"):
+    """Async counterpart of cached_speech."""
+    cache = get_cache()
+    audio = cache.get(text, voice, model, fmt)
+    if audio is None:
+        with span("tts"):
+            response = await acall_with_retries("tts", client.audio.speech.create,
+                                                model=model, voice=voice, input=text, response_format=fmt)
+        audio = response.content
+        cache.put(text, audio, voice, model, fmt)
+    return audio
+
+
+_next_script = {}
+
+
+def library_clip(intent, voice="shimmer", model="tts-1", fmt="pcm"):
+    """Returns (script, audio) for the next pre-rendered script of an intent, or None if not cached.
+
+    Scripts rotate so repeated requests don't hear the same words every time.
+    """
+    scripts = CALMING_LIBRARY[intent]
+    start = _next_script.get(intent, 0)
+    for offset in range(len(scripts)):
+        index = (start + offset) % len(scripts)
+        audio = get_cache().get(scripts[index], voice, model, fmt)
+        if audio is not None:
+            _next_script[intent] = index + 1
+            return scripts[index], audio
+    return None
+
+
+def prerender(voice="shimmer", model="tts-1", formats=("pcm", "mp3")):
+    """Synthesizes every library script into the cache."""
+    client = get_client()
+    for intent, scripts in CALMING_LIBRARY.items():
+        for script in scripts:
+            for fmt in formats:
+                cached_speech(client, script, voice, model, fmt)
+        print(f"✅ Pre-rendered {len(scripts)} '{intent}' scripts")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    render = subcommands.add_parser("prerender", help="fill the cache with the calming library")
+    render.add_argument("--voice", default=None, help="TTS voice (default: the profile's voice)")
+    render.add_argument("--profile", type=int, default=None, help="saved questionnaire profile id (default: latest)")
+    render.add_argument("--model", default="tts-1")
+    render.add_argument("--formats", nargs="+", default=["pcm", "mp3"])
+    args = parser.parse_args()
+
+    if args.command == "prerender":
+        from profiles import load_profile, tts_voice
+
+        voice = args.voice or tts_voice(load_profile(args.profile))
+        print(f"🔊 Rendering in the '{voice}' voice")
+        prerender(voice, args.model, args.formats)
+
+
+if __name__ == "__main__":
+    main()
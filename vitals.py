@@ -0,0 +1,318 @@
+"""Vitals ingestion: heart rate and tocodynamometer samples, rolling analytics, per-turn snapshots.
+
+Usage:
+    python vitals.py simulate vitals.csv [--hours 1] [--rate 4] [--every 180]
+
+Sources deliver rows of (time_s, heart_rate, toco) from a CSV replay, a TCP
+socket or a serial port; the socket and serial sources read one
+"time_s,heart_rate,toco" line per sample. Set DOULA_VITALS_SOURCE to
+"csv:<path>", "socket:<host>:<port>" or "serial:<device>".
+"""
+import argparse
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+
+VITALS_SOURCE = os.getenv("DOULA_VITALS_SOURCE", "")
+
+# Bedside monitors typically report heart rate and uterine activity at 4 Hz
+VITALS_RATE_HZ = 4
+HISTORY_S = 24 * 3600
+
+# Contraction counts are per 10 minutes, as on a CTG trace
+CONTRACTION_WINDOW_S = 600
+# A contraction is toco at least this far above its baseline for at least this long
+CONTRACTION_RISE = 15.0
+CONTRACTION_MIN_S = 30
+HR_TREND_WINDOW_S = 300
+RESTING_HR_WINDOW_S = 3600
+
+# A snapshot with no sample older than this (wall clock) is stale: the source went quiet or died
+VITALS_STALE_S = float(os.getenv("DOULA_VITALS_STALE_S", "10"))
+
+# What a turn sees with no source, before the first sample and once the data is stale:
+# no vitals at all, so build_messages leaves them out rather than making them up
+NO_VITALS = {"heart_rate": None, "stress_level": None, "contractions": None, "hr_trend": None, "time": None}
+
+
+class VitalsRing:
+    """Fixed-size ring buffer of (time_s, heart_rate, toco) rows; memory never grows."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = np.zeros((capacity, 3))
+        self.count = 0
+
+    def write(self, rows):
+        n = len(rows)
+        if n > self.capacity:
+            rows = rows[-self.capacity:]
+            self.count += n - self.capacity
+            n = self.capacity
+        start = self.count % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = rows[:first]
+        self.data[:n - first] = rows[first:]
+        self.count += n
+
+    def last(self, n):
+        """Returns the latest n rows (or fewer) in time order."""
+        n = min(n, self.count, self.capacity)
+        end = self.count % self.capacity
+        if n <= end:
+            return self.data[end - n:end]
+        return np.concatenate((self.data[self.capacity - (n - end):], self.data[:end]))
+
+
+def moving_average(x, n):
+    """Trailing moving average over n samples (shorter at the start)."""
+    sums = np.cumsum(x)
+    sums[n:] = sums[n:] - sums[:-n]
+    return sums / np.minimum(np.arange(1, len(x) + 1), n)
+
+
+def contraction_episodes(toco, rate_hz=VITALS_RATE_HZ, rise=CONTRACTION_RISE, min_s=CONTRACTION_MIN_S):
+    """Returns (starts, ends) sample indices of contractions in a toco trace."""
+    smoothed = moving_average(toco, max(1, int(5 * rate_hz)))
+    above = smoothed > np.percentile(smoothed, 20) + rise
+    edges = np.diff(np.concatenate(([0], above.view(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    keep = ends - starts >= min_s * rate_hz
+    return starts[keep], ends[keep]
+
+
+def hr_trend(t, hr):
+    """Least-squares slope of heart rate in BPM per minute."""
+    if len(t) < 2:
+        return 0.0
+    dt = t - t.mean()
+    return float(60 * np.dot(dt, hr - hr.mean()) / max(np.dot(dt, dt), 1e-9))
+
+
+def estimate_stress(heart_rate, resting_hr, trend, contractions):
+    """Heuristic 1-10 stress score from HR above resting, a rising HR and contraction frequency.
+
+    A conversational cue for the prompt, not a clinical measure.
+    """
+    score = 2 + (heart_rate - resting_hr) / 8 + 0.5 * contractions + max(trend, 0.0) / 2
+    return int(np.clip(round(score), 1, 10))
+
+
+def parse_line(line):
+    """Parses a "time_s,heart_rate,toco" line into a 1x3 array, or None for blank or bad lines."""
+    try:
+        row = [float(value) for value in line.strip().split(",")]
+    except ValueError:
+        return None
+    return np.array([row]) if len(row) == 3 else None
+
+
+class CsvReplaySource:
+    """Replays a recorded vitals CSV (header, then time_s,heart_rate,toco rows).
+
+    Rows come in batches of `batch_s` seconds of data; `speed` is the replay
+    rate relative to real time, and None replays as fast as possible.
+    """
+
+    def __init__(self, path, speed=1.0, batch_s=1.0):
+        self.rows = np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
+        self.speed = speed
+        self.batch_s = batch_s
+
+    def batches(self):
+        if not len(self.rows):
+            return
+        t = self.rows[:, 0]
+        bounds = np.searchsorted(t, np.arange(t[0], t[-1] + self.batch_s, self.batch_s), side="right")
+        started = time.perf_counter()
+        previous = 0
+        for bound in bounds:
+            if bound == previous:
+                continue
+            batch = self.rows[previous:bound]
+            previous = bound
+            if self.speed:
+                due = (batch[-1, 0] - t[0]) / self.speed - (time.perf_counter() - started)
+                if due > 0:
+                    time.sleep(due)
+            yield batch
+
+
+class SocketSource:
+    """Reads "time_s,heart_rate,toco" lines from a TCP socket (e.g. a monitor's network bridge)."""
+
+    def __init__(self, host, port):
+        self.address = (host, int(port))
+
+    def batches(self):
+        with socket.create_connection(self.address) as connection, connection.makefile("r") as lines:
+            for line in lines:
+                row = parse_line(line)
+                if row is not None:
+                    yield row
+
+
+class SerialSource:
+    """Reads "time_s,heart_rate,toco" lines from a serial port (pip install pyserial)."""
+
+    def __init__(self, device, baudrate=115200):
+        try:
+            import serial
+        except ImportError:
+            raise ImportError("❌ The serial vitals source needs: pip install pyserial")
+
+        self.port = serial.Serial(device, baudrate)
+
+    def batches(self):
+        with self.port:
+            for line in self.port:
+                row = parse_line(line.decode("ascii", errors="ignore"))
+                if row is not None:
+                    yield row
+
+
+def open_source(spec=VITALS_SOURCE):
+    """Opens the source described by "csv:<path>", "socket:<host>:<port>" or "serial:<device>"."""
+    kind, _, target = spec.partition(":")
+    if kind == "csv":
+        return CsvReplaySource(target)
+    if kind == "socket":
+        host, _, port = target.rpartition(":")
+        return SocketSource(host, port)
+    if kind == "serial":
+        return SerialSource(target)
+    raise ValueError(f"❌ Unknown vitals source '{spec}'. Use csv:<path>, socket:<host>:<port> or serial:<device>")
+
+
+class VitalsMonitor:
+    """Ingests a vitals source into a ring buffer and keeps a ready-made snapshot.
+
+    The ring holds `history_s` seconds at `rate_hz` (a full day at 4 Hz is
+    about 8 MB). Analytics run on the ingest thread once per `update_s` of
+    data, over vectorized rolling windows, so snapshot() is a constant-time
+    read no matter how much history there is.
+    """
+
+    def __init__(self, source=None, rate_hz=VITALS_RATE_HZ, history_s=HISTORY_S, update_s=1.0,
+                 stale_s=VITALS_STALE_S):
+        self.source = source
+        self.rate_hz = rate_hz
+        self.ring = VitalsRing(int(history_s * rate_hz))
+        self.update_s = update_s
+        self.stale_s = stale_s
+        self.samples = 0
+        self.error = None
+        self._subscribers = []
+        self._snapshot = dict(NO_VITALS)
+        self._analyzed_at = None
+        self._received_at = None
+        self._thread = None
+
+    def start(self):
+        if self.source is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="vitals", daemon=True)
+            self._thread.start()
+        return self
+
+    def subscribe(self, callback):
+        """Calls callback(rows) on the ingest thread with every batch of new samples."""
+        self._subscribers.append(callback)
+
+    def _run(self):
+        try:
+            for batch in self.source.batches():
+                self.ingest(batch)
+        except Exception as e:
+            self.error = e
+            print(f"❌ Vitals source failed: {e}")
+        finally:
+            # The last values must not be reported as current once nothing updates them
+            self._snapshot = dict(NO_VITALS)
+
+    def ingest(self, rows):
+        """Adds (time_s, heart_rate, toco) rows and refreshes the snapshot when it is due."""
+        self.ring.write(rows)
+        self.samples += len(rows)
+        self._received_at = time.monotonic()
+        # Subscribers first: event detection should not wait behind the analytics
+        for callback in self._subscribers:
+            callback(rows)
+        now = rows[-1, 0]
+        if self._analyzed_at is None or now - self._analyzed_at >= self.update_s:
+            self._analyzed_at = now
+            self._snapshot = self.analyze()
+
+    def analyze(self):
+        """Computes the snapshot from the rolling windows behind the latest sample."""
+        t, hr, toco = self.ring.last(int(RESTING_HR_WINDOW_S * self.rate_hz)).T
+        recent = slice(-int(10 * self.rate_hz), None)
+        trend_window = slice(-int(HR_TREND_WINDOW_S * self.rate_hz), None)
+        contraction_window = slice(-int(CONTRACTION_WINDOW_S * self.rate_hz), None)
+
+        heart_rate = float(np.median(hr[recent]))
+        trend = hr_trend(t[trend_window], hr[trend_window])
+        starts, _ = contraction_episodes(toco[contraction_window], self.rate_hz)
+        contractions = len(starts)
+        return {
+            "heart_rate": int(round(heart_rate)),
+            # Resting HR from the last hour, decimated to 1 Hz to keep the median cheap at high rates
+            "stress_level": estimate_stress(heart_rate, float(np.median(hr[::max(1, int(self.rate_hz))])),
+                                            trend, contractions),
+            "contractions": contractions,
+            "hr_trend": trend,
+            "time": float(t[-1]),
+        }
+
+    def snapshot(self):
+        """Returns the latest vitals, or NO_VITALS before the first sample and once they are stale."""
+        if self._received_at is None or time.monotonic() - self._received_at > self.stale_s:
+            return NO_VITALS
+        return self._snapshot
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_vitals():
+    """Returns the process-wide vitals monitor, reading DOULA_VITALS_SOURCE if it is set."""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = VitalsMonitor(open_source() if VITALS_SOURCE else None).start()
+        return _monitor
+
+
+def synthesize_vitals(seconds, rate_hz=VITALS_RATE_HZ, contraction_every_s=180, contraction_s=60,
+                      resting_hr=85, seed=0):
+    """Generates a labor-like trace: periodic contractions with a heart-rate rise during each."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * rate_hz)) / rate_hz
+    phase = t % contraction_every_s
+    wave = np.where(phase < contraction_s, np.sin(np.pi * phase / contraction_s) ** 2, 0.0)
+    hr = resting_hr + 25 * wave + rng.normal(0, 2, len(t))
+    toco = 15 + 60 * wave + rng.normal(0, 2, len(t))
+    return np.column_stack((t, hr, toco))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    simulate = subcommands.add_parser("simulate", help="write a synthetic vitals CSV for replay")
+    simulate.add_argument("output")
+    simulate.add_argument("--hours", type=float, default=1.0)
+    simulate.add_argument("--rate", type=float, default=VITALS_RATE_HZ)
+    simulate.add_argument("--every", type=float, default=180, help="seconds between contractions")
+    args = parser.parse_args()
+
+    if args.command == "simulate":
+        rows = synthesize_vitals(args.hours * 3600, args.rate, args.every)
+        np.savetxt(args.output, rows, delimiter=",", fmt="%.3f", header="time_s,heart_rate,toco", comments="")
+        print(f"✅ Wrote {len(rows)} samples to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
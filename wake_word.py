@@ -0,0 +1,270 @@
+import json
+import os
+import threading
+from functools import lru_cache
+
+import numpy as np
+import vosk
+
+from audio_capture import FRAME_MS, WHISPER_RATE, AudioRing, MicrophoneSource, capture_utterance, frame_levels
+
+VOSK_MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vosk-model-small-en-us-0.15")
+
+WAKE_WORDS = ("hey",)
+
+# Phrases the low-power recognizer is restricted to; everything else maps to [unk]
+WAKE_GRAMMAR = ["hey doula", "hey", "[unk]"]
+
+# While a reply plays, the speaker's echo can sound like "hey": only the full phrase
+# interrupts, and the energy gate wants speech this much louder than usual
+BARGE_IN_PHRASE = ("hey", "doula")
+ECHO_MARGIN_DB = float(os.getenv("DOULA_ECHO_MARGIN_DB", "10"))
+
+
+@lru_cache(maxsize=None)
+def load_vosk_model(model_path=VOSK_MODEL_PATH):
+    """Loads a Vosk model once per process."""
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(
+            f"❌ Vosk model not found at {model_path}. Download from: https://alphacephei.com/vosk/models")
+    return vosk.Model(model_path)
+
+
+class EnergyGate:
+    """Cheap VAD in front of the recognizer that drops blocks containing only silence.
+
+    Levels for all 30 ms frames of a block are computed in one vectorized pass;
+    a block passes if any frame is `threshold_db` above the running noise floor
+    (and above `min_level_db`). A short hangover keeps trailing audio flowing so
+    the recognizer can finish a word, and the last dropped block is replayed as
+    pre-roll when speech starts.
+    """
+
+    def __init__(self, samplerate, threshold_db=10.0, min_level_db=-45.0, hangover_ms=300):
+        self.frame_len = int(samplerate * FRAME_MS / 1000)
+        self.threshold_db = threshold_db
+        self.min_level_db = min_level_db
+        self.noise_db = min_level_db - threshold_db
+        self.hangover_samples = int(samplerate * hangover_ms / 1000)
+        self._hangover = 0
+        self._preroll = None
+        self.passed = 0
+        self.dropped = 0
+
+    def process(self, block, margin_db=0.0):
+        """Returns the audio to hand to the recognizer, or None if the block is silent.
+
+        `margin_db` raises the speech threshold for this block.
+        """
+        n = max(1, len(block) // self.frame_len)
+        levels = frame_levels(block[:n * self.frame_len].reshape(n, -1))
+        speech = levels > max(self.noise_db + self.threshold_db, self.min_level_db) + margin_db
+        # Noise floor follows the quietest frame: quickly down, slowly up, so
+        # steady background noise (fans, monitors) is absorbed within seconds
+        floor = levels.min()
+        self.noise_db += (0.3 if floor < self.noise_db else 0.005) * (floor - self.noise_db)
+
+        if speech.any():
+            self._hangover = self.hangover_samples
+            if self._preroll is not None:
+                block = np.concatenate((self._preroll, block))
+                self._preroll = None
+        elif self._hangover > 0:
+            self._hangover -= len(block)
+        else:
+            self._preroll = block
+            self.dropped += len(block)
+            return None
+
+        self.passed += len(block)
+        return block
+
+
+class RingCursor:
+    """Audio source that reads a listener's ring buffer from a given position.
+
+    Behaves like MicrophoneSource, so capture_utterance can record straight
+    from the always-on stream without reopening the device.
+    """
+
+    def __init__(self, listener, position):
+        self.listener = listener
+        self.samplerate = listener.samplerate
+        self.position = position
+
+    @property
+    def ended(self):
+        return self.listener.ring.closed and self.position >= self.listener.ring.end
+
+    def read(self, timeout=None):
+        samples, self.position = self.listener.ring.read(self.position, timeout=timeout)
+        return samples if len(samples) else None
+
+
+class WakeWordListener:
+    """Long-lived wake-word listener.
+
+    Loads the Vosk model once and keeps one capture stream open, feeding an
+    always-on ring buffer. Wake-word detection and the recorder both read from
+    that ring, so speech right after the wake phrase is never lost.
+
+    With low_power=True silent audio is dropped by an EnergyGate and the
+    recognizer is restricted to WAKE_GRAMMAR, firing on partial results
+    instead of waiting for the end of the utterance.
+    """
+
+    def __init__(self, model_path=VOSK_MODEL_PATH, source=None, wake_words=WAKE_WORDS, ring_seconds=30,
+                 low_power=False, grammar=WAKE_GRAMMAR, barge_in_phrase=BARGE_IN_PHRASE, echo_margin_db=ECHO_MARGIN_DB):
+        self.model = load_vosk_model(model_path)
+        self.low_power = low_power
+        self.grammar = grammar
+        self.source = source or MicrophoneSource(WHISPER_RATE)
+        self.samplerate = self.source.samplerate
+        self.wake_words = tuple(word.lower() for word in wake_words)
+        self.barge_in_phrase = tuple(word.lower() for word in barge_in_phrase)
+        self.echo_margin_db = echo_margin_db
+        self.ring = AudioRing(int(ring_seconds * self.samplerate))
+        self.gate = None
+        self._thread = None
+
+    def start(self):
+        """Opens the capture stream and starts filling the ring buffer."""
+        if self._thread is None:
+            self.source.start()
+            self._thread = threading.Thread(target=self._pump, name="wake-word-capture", daemon=True)
+            self._thread.start()
+        return self
+
+    def _pump(self):
+        while not self.ring.closed:
+            block = self.source.read(timeout=0.5)
+            if block is not None:
+                self.ring.write(block)
+            elif self.source.ended:
+                break
+        self.ring.close()
+
+    def close(self):
+        self.ring.close()
+        self.source.close()
+
+    def cursor(self, position=None):
+        """Returns a source reading the shared stream from `position` (default: now)."""
+        return RingCursor(self, self.ring.end if position is None else position)
+
+    def _find_wake_word(self, result, key="result", strict=False):
+        """Returns the end time (seconds) of the first wake word in a Vosk result (key="partial_result" for partials).
+
+        With strict=True only the full barge-in phrase counts.
+        """
+        words = result.get(key, [])
+        if strict:
+            spoken = [word["word"] for word in words]
+            n = len(self.barge_in_phrase)
+            for i in range(len(words) - n + 1):
+                if tuple(spoken[i:i + n]) == self.barge_in_phrase:
+                    return words[i + n - 1]["end"]
+            return None
+        for word in words:
+            if word["word"] in self.wake_words:
+                return word["end"]
+        return None
+
+    def _heard_wake_word(self, text, strict=False):
+        if strict:
+            return f" {' '.join(self.barge_in_phrase)} " in f" {text} "
+        return any(word in self.wake_words for word in text.split())
+
+    def wait_for_wake_word(self, position=None, on_text=None, stop=None, strict=None):
+        """Blocks until a wake word is heard in the stream from `position` (default: now).
+
+        Returns the absolute sample position right after the wake word, or None
+        if the stream ended first or the `stop` event was set. `on_text`
+        receives each recognized phrase. Whenever `strict()` returns True (say,
+        while a reply plays) only the full barge-in phrase counts, and in
+        low-power mode the energy gate adds `echo_margin_db`.
+        """
+        cursor = self.cursor(position)
+        strict = strict or (lambda: False)
+        if self.low_power:
+            return self._wait_low_power(cursor, on_text, stop, strict)
+
+        start = cursor.position
+        recognizer = vosk.KaldiRecognizer(self.model, self.samplerate)
+        recognizer.SetWords(True)
+
+        while True:
+            if stop is not None and stop.is_set():
+                return None
+            block = cursor.read(timeout=0.5)
+            if block is None:
+                if not cursor.ended:
+                    continue
+                result = json.loads(recognizer.FinalResult())
+            elif recognizer.AcceptWaveform(block.tobytes()):
+                result = json.loads(recognizer.Result())
+            else:
+                continue
+
+            if on_text and result.get("text"):
+                on_text(result["text"])
+            wake_end = self._find_wake_word(result, strict=strict())
+            if wake_end is not None:
+                return start + int(wake_end * self.samplerate)
+            if block is None:
+                return None
+
+    def record_after(self, position, on_block=None, **endpointer_args):
+        """Records the request that follows the wake word at `position`."""
+        return capture_utterance(self.cursor(position), on_block=on_block, **endpointer_args)
+
+    def _wait_low_power(self, cursor, on_text, stop, strict):
+        recognizer = vosk.KaldiRecognizer(self.model, self.samplerate, json.dumps(self.grammar))
+        recognizer.SetWords(True)
+        recognizer.SetPartialWords(True)
+        gate = self.gate = EnergyGate(self.samplerate)
+        # The recognizer only hears the blocks the gate passes, so its word times count
+        # fed samples; each segment maps a fed offset back to where it starts in the stream
+        fed = 0
+        segments = []
+
+        while True:
+            if stop is not None and stop.is_set():
+                return None
+            block = cursor.read(timeout=0.5)
+            if block is None:
+                if cursor.ended:
+                    return None
+                continue
+            strict_now = strict()
+            voiced = gate.process(block, self.echo_margin_db if strict_now else 0.0)
+            if voiced is None:
+                continue
+            segments.append((fed, cursor.position - len(voiced)))
+            fed += len(voiced)
+
+            if recognizer.AcceptWaveform(voiced.tobytes()):
+                result = json.loads(recognizer.Result())
+                wake_end = self._find_wake_word(result, strict=strict_now)
+                if on_text and result.get("text"):
+                    on_text(result["text"])
+            else:
+                result = json.loads(recognizer.PartialResult())
+                wake_end = self._find_wake_word(result, "partial_result", strict_now)
+                if wake_end is None and self._heard_wake_word(result.get("partial", ""), strict_now):
+                    # Heard but not timed: rewind to the start of this block rather than skip past the request
+                    return segments[-1][1]
+
+            if wake_end is not None:
+                return self._stream_position(segments, int(wake_end * self.samplerate))
+            if "text" in result:
+                # The utterance is over; later words fall in blocks still to come
+                del segments[:-1]
+
+    @staticmethod
+    def _stream_position(segments, fed_sample):
+        """Maps a sample offset in the audio fed to the recognizer back to its position in the stream."""
+        for fed_start, stream_start in reversed(segments):
+            if fed_start <= fed_sample:
+                return stream_start + fed_sample - fed_start
+        return segments[0][1]
@@ -0,0 +1,493 @@
+"""Ward server: one process serving every bed, with one shared ASR model and batched transcription.
+
+Usage:
+    python ward_server.py serve [--host 127.0.0.1] [--port 8770] [--certfile ward.pem --keyfile ward.key]
+                                [--asr-workers 1] [--max-batch 8] [--max-wait-ms 50]
+    python ward_server.py bed BED_ID [--host 127.0.0.1] [--port 8770] [--cafile ward.pem] [--profile ID]
+
+Both sides need the shared DOULA_WARD_TOKEN (or --token); a connection whose
+hello doesn't carry it is dropped. The server only listens on localhost
+unless --host says otherwise, and a non-loopback address needs a TLS
+certificate (--certfile/--keyfile, or DOULA_WARD_CERT/DOULA_WARD_KEY), so
+patient audio, transcripts and replies never cross the ward network in
+cleartext; beds verify it against --cafile (DOULA_WARD_CA).
+
+Each bed listens for the wake word itself, as app.py does, and only the
+request that follows it is streamed to the server as 16 kHz int16 PCM:
+conversation in the room and the bed's own replies never leave the bed,
+and saying the wake word over a reply stops it. The server runs every bed
+on one event loop and gathers finished requests from all beds into batches
+for the ASR model; a batch goes as soon as a decoder is free and either
+`max_batch` requests are waiting or the oldest has waited `max_wait_ms`.
+Decoding runs in a process pool with one model per worker process, so the
+default single worker keeps one model in memory for the whole ward.
+Routing, the response and TTS then run per bed, each with its own
+conversation memory. `bed` runs this machine's microphone and speaker as
+one bed.
+
+Frames in both directions are a kind byte, a 4-byte big-endian length and
+the payload:
+    client -> server  "H" hello JSON {"bed": ..., "profile": id or null, "token": ...},
+                      "W" wake word heard (empty), "A" request audio, "V" vitals JSON
+                      {"heart_rate", "stress_level", "contractions"} (only when the bed has a monitor),
+                      "U" end of request (empty); audio outside W..U is ignored
+    server -> client  "E" event JSON {"type": "transcript" | "response" | "command" | "alert" | "error", ...},
+                      "P" speech as 24 kHz int16 PCM
+"""
+import argparse
+import asyncio
+import hmac
+import ipaddress
+import json
+import os
+import ssl
+import struct
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import openai
+
+from asr import get_backend
+from audio_capture import WHISPER_RATE, blocks_to_float32
+from deadline import speak_with_deadline
+from intents import COMMAND_INTENTS, route
+from memory import SessionMemory
+from metrics import count, observe, set_gauge, start_exporter
+from nurse_call import NURSE_CALL, call_nurse, nurse_reply
+from openai_client import get_async_client, get_client
+from profiles import load_profile, system_prompt, tts_voice
+from prompts import build_messages
+from tts_cache import CALMING_LIBRARY, library_clip
+
+WARD_HOST = os.getenv("DOULA_WARD_HOST", "127.0.0.1")
+WARD_PORT = int(os.getenv("DOULA_WARD_PORT", "8770"))
+WARD_TOKEN = os.getenv("DOULA_WARD_TOKEN", "")
+WARD_CERT = os.getenv("DOULA_WARD_CERT", "")
+WARD_KEY = os.getenv("DOULA_WARD_KEY", "")
+WARD_CA = os.getenv("DOULA_WARD_CA", "")
+
+MAX_BATCH = 8
+MAX_WAIT_MS = 50
+
+# Shorter requests are dropped; longer ones are cut (the bed's endpointer stops at 10 s)
+MIN_REQUEST_MS = 300
+MAX_REQUEST_MS = 15000
+
+HEADER = struct.Struct(">cI")
+
+
+async def read_frame(reader):
+    """Returns (kind, payload), or (None, None) once the peer has disconnected."""
+    try:
+        kind, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+        return kind, await reader.readexactly(length)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None, None
+
+
+def write_frame(writer, kind, payload):
+    writer.write(HEADER.pack(kind, len(payload)) + payload)
+
+
+def write_event(writer, kind, **data):
+    write_frame(writer, b"E", json.dumps({"type": kind, **data}).encode())
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+_worker_backend = None
+
+
+def _load_worker(factory, options):
+    global _worker_backend
+    _worker_backend = factory(**options)
+
+
+def _decode(audios):
+    return _worker_backend.transcribe_batch(audios)
+
+
+class BatchTranscriber:
+    """Transcribes utterances from every bed, decoding whatever is waiting as one batch.
+
+    `factory(**options)` loads the model in each of the `workers` processes
+    (get_backend by default). While every worker is busy, new utterances
+    queue up and go out together in the next batch, so batches grow with
+    load instead of latency growing with the queue.
+    """
+
+    def __init__(self, factory=get_backend, options=None, workers=1, max_batch=MAX_BATCH,
+                 max_wait_s=MAX_WAIT_MS / 1000):
+        self.executor = ProcessPoolExecutor(workers, initializer=_load_worker, initargs=(factory, options or {}))
+        self.workers = workers
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_s
+        self.batches = 0
+        self.utterances = 0
+        self._pending = deque()
+        self._busy = 0
+        self._timer = None
+
+    def warm_up(self):
+        """Loads the model in every worker before the first bed needs it."""
+        silence = [np.zeros(WHISPER_RATE, dtype=np.float32)]
+        for future in [self.executor.submit(_decode, silence) for _ in range(self.workers)]:
+            future.result()
+        return self
+
+    async def transcribe(self, audio):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((time.perf_counter(), audio, future))
+        self._dispatch()
+        return await future
+
+    def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while self._pending and self._busy < self.workers:
+            waited = time.perf_counter() - self._pending[0][0]
+            if len(self._pending) < self.max_batch and waited < self.max_wait_s:
+                if self._timer is None:
+                    self._timer = loop.call_later(self.max_wait_s - waited, self._on_timer)
+                return
+            batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+            self._busy += 1
+            loop.create_task(self._run(batch))
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    async def _run(self, batch):
+        started = time.perf_counter()
+        try:
+            texts = await asyncio.get_running_loop().run_in_executor(
+                self.executor, _decode, [audio for _, audio, _ in batch])
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, _, future), text in zip(batch, texts):
+                # A bed that disconnected or was interrupted may have stopped waiting
+                if not future.done():
+                    future.set_result(text)
+        finally:
+            self._busy -= 1
+            self.batches += 1
+            self.utterances += len(batch)
+            observe("transcribe_batch", time.perf_counter() - started)
+            count("doula_asr_batched_utterances_total", len(batch))
+            self._dispatch()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+class SocketPlayer:
+    """The streaming_response player interface, sending speech to the bed to play."""
+
+    def __init__(self, session):
+        self.session = session
+
+    async def play(self, pcm):
+        write_frame(self.session.writer, b"P", pcm)
+        await self.session.writer.drain()
+
+    async def close(self):
+        pass
+
+
+class BedSession:
+    """One bed's requests, its current response and its own conversation memory."""
+
+    def __init__(self, server, bed, writer, profile=None):
+        self.server = server
+        self.bed = bed
+        self.writer = writer
+        self.system_prompt = system_prompt(profile)
+        self.voice = tts_voice(profile)
+        self.memory = SessionMemory(server.sync_client)
+        # Sent by the bed with each request; without a monitor the reply is made without vitals
+        self.vitals = None
+        self.blocks = None
+        self.samples = 0
+        self.response = None
+        self._tasks = set()
+
+    def event(self, kind, **data):
+        write_event(self.writer, kind, **data)
+
+    def wake(self):
+        """The bed heard the wake word: its reply stops and a new request starts."""
+        self.interrupt()
+        self.blocks = []
+        self.samples = 0
+
+    def feed(self, block):
+        """Adds a block of the open request; audio with no request open is dropped."""
+        if self.blocks is None or self.samples >= MAX_REQUEST_MS * WHISPER_RATE // 1000:
+            return
+        self.blocks.append(block)
+        self.samples += len(block)
+
+    def end(self):
+        """Closes the request; returns it as float32, or None if there was none worth transcribing."""
+        blocks, self.blocks = self.blocks, None
+        if not blocks or self.samples < MIN_REQUEST_MS * WHISPER_RATE // 1000:
+            return None
+        return blocks_to_float32(blocks, WHISPER_RATE)
+
+    def submit(self, audio):
+        task = asyncio.create_task(self.handle(audio))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def handle(self, audio):
+        text = (await self.server.asr.transcribe(audio)).strip()
+        self.event("transcript", text=text)
+        if not text:
+            return
+        intent = route(text)
+        if intent in COMMAND_INTENTS:
+            if intent == "stop":
+                self.interrupt()
+            self.event("command", intent=intent)
+            if intent == "call_nurse":
+                self.call_nurse(text)
+            return
+        # A new request replaces whatever this bed is still hearing
+        self.interrupt()
+        self.response = asyncio.create_task(self.respond(text, intent))
+
+    def call_nurse(self, text):
+        """Sends this bed's nurse call and speaks an acknowledgement, then breathing guidance, at once."""
+        print(f"🚨 Bed {self.bed}: she asked for the nurse!")
+        self.event("alert", text="🚨 She asked for the nurse!")
+        if NURSE_CALL:
+            # Not the response task: a new request must not cancel the call
+            call = asyncio.create_task(asyncio.to_thread(call_nurse, self.bed, text))
+            self._tasks.add(call)
+            call.add_done_callback(self._tasks.discard)
+            call.add_done_callback(self._nurse_call_done)
+        self.interrupt()
+        self.response = asyncio.create_task(self.play_clips(nurse_reply(bool(NURSE_CALL), self.voice)))
+
+    def _nurse_call_done(self, call):
+        if call.cancelled() or call.result():
+            return
+        print(f"❌ Bed {self.bed}: the nurse call could not be sent")
+        self.event("alert", text="❌ The nurse call could not be sent: press the call button!")
+        self.interrupt()
+        self.response = asyncio.create_task(self.play_clips(nurse_reply(False, self.voice)))
+
+    async def play_clips(self, clips):
+        for script, pcm in clips:
+            self.event("response", text=script)
+            await SocketPlayer(self).play(pcm)
+
+    def interrupt(self):
+        if self.response is not None and not self.response.done():
+            self.response.cancel()
+            self.event("command", intent="stop")
+
+    async def respond(self, text, intent):
+        clip = library_clip(intent, voice=self.voice) if intent in CALMING_LIBRARY else None
+        if clip:
+            await self.play_clips([clip])
+            return
+        vitals = self.vitals or {}
+        heart_rate, stress_level, contractions = (vitals.get("heart_rate"), vitals.get("stress_level"),
+                                                  vitals.get("contractions"))
+        messages = self.memory.with_history(
+            build_messages(text, heart_rate, stress_level, contractions, self.system_prompt))
+        try:
+            reply, _ = await speak_with_deadline(
+                self.server.client, messages, SocketPlayer(self), text, heart_rate, stress_level, contractions,
+                on_sentence=lambda sentence: self.event("response", text=sentence),
+                on_fallback=lambda script: self.event("response", text=script), voice=self.voice)
+        except (openai.OpenAIError, ConnectionError) as e:
+            self.event("error", text=f"❌ AI response failed: {e}")
+            return
+        self.memory.add_turn(text, reply)
+
+    def close(self):
+        for task in list(self._tasks) + [self.response]:
+            if task is not None:
+                task.cancel()
+
+
+class WardServer:
+    """Accepts bed connections and runs every session on one event loop."""
+
+    def __init__(self, asr, client=None, sync_client=None, token=WARD_TOKEN):
+        if not token:
+            raise ValueError("❌ The ward server needs a shared token: set DOULA_WARD_TOKEN")
+        self.asr = asr
+        self.client = client or get_async_client()
+        self.sync_client = sync_client or get_client()
+        self.token = token
+        self.sessions = {}
+
+    async def start(self, host=WARD_HOST, port=WARD_PORT, ssl_context=None):
+        if ssl_context is None and not is_loopback(host):
+            raise ValueError(f"❌ Serving on {host} needs TLS: pass --certfile and --keyfile")
+        return await asyncio.start_server(self.handle_connection, host, port, ssl=ssl_context)
+
+    async def handle_connection(self, reader, writer):
+        kind, payload = await read_frame(reader)
+        try:
+            hello = json.loads(payload) if kind == b"H" else {}
+        except ValueError:
+            hello = {}
+        if not hmac.compare_digest(str(hello.get("token", "")).encode(), self.token.encode()):
+            print(f"❌ Rejected a connection from {writer.get_extra_info('peername')}: bad or missing token")
+            writer.close()
+            return
+        profile = load_profile(hello["profile"]) if hello.get("profile") is not None else None
+        session = BedSession(self, str(hello.get("bed", len(self.sessions) + 1)), writer, profile)
+        self.sessions[session.bed] = session
+        set_gauge("doula_ward_sessions", len(self.sessions))
+        print(f"🛏 Bed {session.bed} connected")
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                if kind is None:
+                    break
+                if kind == b"W":
+                    session.wake()
+                elif kind == b"A":
+                    session.feed(np.frombuffer(payload, dtype=np.int16))
+                elif kind == b"V":
+                    session.vitals = json.loads(payload)
+                elif kind == b"U":
+                    audio = session.end()
+                    if audio is not None:
+                        session.submit(audio)
+        finally:
+            session.close()
+            if self.sessions.get(session.bed) is session:
+                del self.sessions[session.bed]
+            set_gauge("doula_ward_sessions", len(self.sessions))
+            writer.close()
+            print(f"🛏 Bed {session.bed} disconnected")
+
+
+async def serve(args):
+    # Checked before the model is loaded, so a misconfigured server fails at once
+    if not args.token:
+        raise SystemExit("❌ Set DOULA_WARD_TOKEN (or --token) to a shared secret for the beds")
+    if not args.certfile and not is_loopback(args.host):
+        raise SystemExit(f"❌ Serving on {args.host} needs TLS: pass --certfile and --keyfile")
+    ssl_context = None
+    if args.certfile:
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(args.certfile, args.keyfile or None)
+
+    asr = BatchTranscriber(workers=args.asr_workers, max_batch=args.max_batch,
+                           max_wait_s=args.max_wait_ms / 1000)
+    print("⏳ Loading the ASR model...")
+    await asyncio.to_thread(asr.warm_up)
+    start_exporter()
+    server = await WardServer(asr, token=args.token).start(args.host, args.port, ssl_context)
+    print(f"✅ Ward server listening on {args.host}:{args.port}")
+    async with server:
+        await server.serve_forever()
+
+
+async def run_bed(args):
+    from playback import decode_audio, get_engine
+    from vitals import get_vitals
+    from wake_word import WakeWordListener
+
+    if not args.token:
+        raise SystemExit("❌ Set DOULA_WARD_TOKEN (or --token) to the ward server's token")
+    ssl_context = None if is_loopback(args.host) else ssl.create_default_context(cafile=args.cafile or None)
+    reader, writer = await asyncio.open_connection(args.host, args.port, ssl=ssl_context)
+    write_frame(writer, b"H", json.dumps({"bed": args.bed, "profile": args.profile, "token": args.token}).encode())
+    monitor = get_vitals()
+    listener = WakeWordListener(low_power=True).start()
+    engine = get_engine()
+    loop = asyncio.get_running_loop()
+
+    def send(kind, payload=b""):
+        loop.call_soon_threadsafe(write_frame, writer, kind, payload)
+
+    def listen():
+        """Forwards each request after the wake word; the wake word also stops a reply that is playing."""
+        while True:
+            # While a reply plays only the full phrase counts, so the speaker's echo doesn't stop it
+            position = listener.wait_for_wake_word(strict=lambda: engine.speaking)
+            if position is None:
+                return
+            if engine.speaking:
+                engine.stop()
+            print("✅ Wake word detected, sending the request...")
+            send(b"W")
+            listener.record_after(position, on_block=lambda block: send(b"A", block.tobytes()))
+            vitals = monitor.snapshot()
+            if vitals["time"] is not None:
+                send(b"V", json.dumps({key: vitals[key] for key in ("heart_rate", "stress_level", "contractions")
+                                       }).encode())
+            send(b"U")
+
+    async def receive():
+        while True:
+            kind, payload = await read_frame(reader)
+            if kind is None:
+                print("❌ Ward server disconnected")
+                return
+            if kind == b"P":
+                engine.enqueue(decode_audio(payload, "pcm", engine.samplerate))
+                continue
+            event = json.loads(payload)
+            if event["type"] == "command" and event["intent"] == "stop":
+                engine.stop()
+            elif event.get("text"):
+                print(f"{event['type']}: {event['text']}")
+
+    sender = asyncio.create_task(asyncio.to_thread(listen))
+    try:
+        await receive()
+    finally:
+        sender.cancel()
+        listener.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    server = subcommands.add_parser("serve", help="serve every bed from this machine")
+    server.add_argument("--host", default=WARD_HOST)
+    server.add_argument("--port", type=int, default=WARD_PORT)
+    server.add_argument("--token", default=WARD_TOKEN, help="shared token beds must send (DOULA_WARD_TOKEN)")
+    server.add_argument("--certfile", default=WARD_CERT, help="TLS certificate, required off localhost")
+    server.add_argument("--keyfile", default=WARD_KEY)
+    server.add_argument("--asr-workers", type=int, default=1, help="decoder processes, each with its own model")
+    server.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    server.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    bed = subcommands.add_parser("bed", help="stream this machine's microphone as one bed")
+    bed.add_argument("bed")
+    bed.add_argument("--host", default="127.0.0.1")
+    bed.add_argument("--port", type=int, default=WARD_PORT)
+    bed.add_argument("--token", default=WARD_TOKEN)
+    bed.add_argument("--cafile", default=WARD_CA, help="CA to verify the server's certificate (default: system CAs)")
+    bed.add_argument("--profile", type=int, default=None, help="saved questionnaire profile id")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args) if args.command == "serve" else run_bed(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Background warm-up of the models, and readiness reporting, for a fast cold start.
+
+Usage:
+    python warmup.py [--backend whisper] [--model base]
+
+Each model loads on its own thread and runs one dummy inference on silence,
+so weights are paged in and buffers allocated before the first real request.
+The readiness state moves from "starting" to "listening" once the
+wake-word model is loaded (the wake word, spoken commands and cached audio
+work from then on) and to "ready" once the ASR backend is warm too; it is
+"degraded" if the wake word works but something else failed to load. The
+command prints when each component became ready.
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from audio_capture import WHISPER_RATE
+
+
+class Warmup:
+    """Loads components on background threads and tracks their readiness.
+
+    start(name, load) runs load() on its own thread; wait(name) blocks until
+    it has finished and returns its result (or raises its error).
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._components = {}
+        self._cond = threading.Condition()
+
+    def start(self, name, load):
+        with self._cond:
+            self._components[name] = {"state": "loading", "seconds": None, "result": None, "error": None}
+        threading.Thread(target=self._load, args=(name, load), name=f"warmup-{name}", daemon=True).start()
+        return self
+
+    def _load(self, name, load):
+        try:
+            result, error = load(), None
+        except Exception as e:
+            result, error = None, e
+            print(f"❌ Loading {name} failed: {e}")
+        with self._cond:
+            self._components[name].update(state="failed" if error else "ready", result=result, error=error,
+                                          seconds=time.perf_counter() - self.started)
+            self._cond.notify_all()
+
+    def wait(self, name, timeout=None):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._components[name]["state"] != "loading", timeout):
+                raise TimeoutError(f"❌ {name} is still loading")
+            component = self._components[name]
+        if component["error"] is not None:
+            raise component["error"]
+        return component["result"]
+
+    def is_ready(self, name):
+        with self._cond:
+            return name in self._components and self._components[name]["state"] == "ready"
+
+    def failed(self):
+        """{name: error message} for every component that failed to load."""
+        with self._cond:
+            return {name: str(component["error"]) for name, component in self._components.items()
+                    if component["state"] == "failed"}
+
+    @property
+    def state(self):
+        """"starting", "listening" (wake word and cached audio work), "ready" (everything loaded)
+        or "degraded" (the wake word works, but something else failed to load)."""
+        with self._cond:
+            states = {name: component["state"] for name, component in self._components.items()}
+        if all(state == "ready" for state in states.values()):
+            return "ready"
+        if states.get("wake") != "ready":
+            return "starting"
+        if "failed" in states.values():
+            return "degraded"
+        return "listening"
+
+    def status(self):
+        """The overall state plus each component's state, load time and error."""
+        with self._cond:
+            components = {name: {"state": component["state"], "seconds": component["seconds"],
+                                 "error": component["error"] and str(component["error"])}
+                          for name, component in self._components.items()}
+        return {"state": self.state, "components": components}
+
+
+def warm_wake_model():
+    """Loads the Vosk model (shared with WakeWordListener) and runs the wake grammar over silence."""
+    import json
+
+    import vosk
+
+    from wake_word import WAKE_GRAMMAR, load_vosk_model
+
+    model = load_vosk_model()
+    vosk.KaldiRecognizer(model, WHISPER_RATE, json.dumps(WAKE_GRAMMAR)).AcceptWaveform(
+        np.zeros(WHISPER_RATE // 2, dtype=np.int16).tobytes())
+    return model
+
+
+def warm_asr(name=None, **options):
+    """Loads the ASR backend and transcribes a second of silence."""
+    from asr import ASR_BACKEND, get_backend
+
+    backend = get_backend(name or ASR_BACKEND, **options)
+    backend.transcribe(np.zeros(WHISPER_RATE, dtype=np.float32))
+    return backend
+
+
+def warm_api(api_key=None):
+    """Imports the OpenAI SDK and opens the shared clients (importing openai alone takes most of a second)."""
+    from openai_client import get_async_client, get_client
+
+    get_async_client(api_key=api_key)
+    return get_client(api_key=api_key)
+
+
+def warm_fallbacks(voice="shimmer"):
+    """Renders the deadline fallbacks missing from the TTS cache in `voice` with offline TTS (pyttsx3, if installed)."""
+    from deadline import prerender_fallbacks
+
+    return prerender_fallbacks(voice)
+
+
+def start_warmup(asr_name=None, asr_options=None, api_key=None, voice="shimmer"):
+    """Starts loading the wake-word model, the ASR backend, the fallback clips and the API clients in parallel."""
+    warmup = Warmup()
+    warmup.start("wake", warm_wake_model)
+    warmup.start("asr", lambda: warm_asr(asr_name, **(asr_options or {})))
+    warmup.start("fallback", lambda: warm_fallbacks(voice))
+    if api_key:
+        warmup.start("api", lambda: warm_api(api_key))
+    return warmup
+
+
+class WarmBackend:
+    """The ASR backend being warmed up: calls wait until it is ready.
+
+    Recording and incremental transcription can start straight away; the
+    transcriber thread simply blocks on the first decode until the model is
+    loaded.
+    """
+
+    def __init__(self, warmup, name="asr"):
+        self.warmup = warmup
+        self.name = name
+
+    @property
+    def backend(self):
+        try:
+            return self.warmup.wait(self.name)
+        except Exception as e:
+            raise RuntimeError(f"The speech model failed to load: {e}") from e
+
+    def segments(self, audio, prompt=None):
+        return self.backend.segments(audio, prompt)
+
+    def transcribe(self, audio, prompt=None):
+        return self.backend.transcribe(audio, prompt)
+
+    def transcribe_batch(self, audios):
+        return self.backend.transcribe_batch(audios)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", default=None)
+    parser.add_argument("--model", default=None)
+    args = parser.parse_args()
+
+    warmup = start_warmup(args.backend, {"model_size": args.model} if args.model else None)
+    for name in ("wake", "asr"):
+        try:
+            warmup.wait(name)
+        except Exception:
+            pass
+    for name, component in warmup.status()["components"].items():
+        mark = "✅" if component["state"] == "ready" else "❌"
+        print(f"{mark} {name}: {component['state']} after {component['seconds']:.2f}s"
+              + (f" ({component['error']})" if component["error"] else ""))
+    print(f"State: {warmup.state}")
+
+
+if __name__ == "__main__":
+    main()